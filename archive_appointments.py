@@ -0,0 +1,242 @@
+"""Partition maintenance and archival for the appointments table.
+
+Usage:
+    python archive_appointments.py [--salon-id 1] partition [--months-ahead 3]
+    python archive_appointments.py [--salon-id 1] archive [--older-than-days 180] [--batch-size 1000]
+    python archive_appointments.py [--salon-id 1] stats [--provider-id 1]
+
+Each run works on the shard holding --salon-id (default SALON_ID) in the
+shard map, so run it once per shard with a salon from that shard.
+
+`partition` converts appointments to monthly RANGE partitions on
+appointment_date (first run) or adds upcoming months (later runs); schedule it
+monthly. MySQL does not allow foreign keys on partitioned tables, so the first
+run drops them and the application deletes dependent appointments itself.
+
+`archive` moves completed and cancelled appointments older than the cutoff into
+the compressed appointments_archive table, then drops partitions left empty.
+
+`stats` prints per-partition row counts and index sizes and times the hot
+listing and conflict queries, so runs before and after partitioning/archival
+can be compared.
+"""
+import argparse
+import os
+import time
+from datetime import date, timedelta
+
+from dotenv import load_dotenv
+
+from salon_app import ShardMap, StatementRegistry
+from tenancy import connect
+
+ARCHIVE_AFTER_DAYS = 180
+ARCHIVED_STATUSES = ("completed", "cancelled")
+ARCHIVE_COLUMNS = ("id, salon_id, customer_id, service_id, provider_id, appointment_date, "
+                   "start_time, end_time, status, notes, created_at")
+
+# Same as schema.sql, for databases created before the archive existed
+ARCHIVE_TABLE = """
+    CREATE TABLE IF NOT EXISTS appointments_archive (
+        id INT PRIMARY KEY,
+        salon_id INT NOT NULL DEFAULT 1,
+        customer_id INT NOT NULL,
+        service_id INT NOT NULL,
+        provider_id INT NOT NULL,
+        appointment_date DATE NOT NULL,
+        start_time TIME NOT NULL,
+        end_time TIME NOT NULL,
+        status ENUM('pending', 'confirmed', 'completed', 'cancelled') NOT NULL,
+        notes TEXT,
+        created_at TIMESTAMP NULL,
+        archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        INDEX idx_archive_salon_date (salon_id, appointment_date),
+        INDEX idx_archive_provider_date (provider_id, appointment_date),
+        INDEX idx_archive_customer (customer_id)
+    ) ENGINE=InnoDB ROW_FORMAT=COMPRESSED DEFAULT CHARSET=utf8mb4
+"""
+
+
+def month_start(day):
+    return day.replace(day=1)
+
+
+def next_month(day):
+    return (day.replace(day=28) + timedelta(days=4)).replace(day=1)
+
+
+def partition_clause(month):
+    """Partition holding every appointment in the month starting at `month`"""
+    return (f"PARTITION p{month:%Y%m} VALUES LESS THAN "
+            f"(TO_DAYS('{next_month(month):%Y-%m-%d}'))")
+
+
+def existing_partitions(cursor):
+    cursor.execute("""
+        SELECT partition_name FROM information_schema.partitions
+        WHERE table_schema = DATABASE() AND table_name = 'appointments'
+        AND partition_name IS NOT NULL
+        ORDER BY partition_ordinal_position
+    """)
+    return [row[0] for row in cursor.fetchall()]
+
+
+def partition(db, months_ahead):
+    """Partition appointments by month, or extend the partitions months_ahead"""
+    cursor = db.cursor()
+    partitions = existing_partitions(cursor)
+    last_month = month_start(date.today())
+    for _ in range(months_ahead):
+        last_month = next_month(last_month)
+
+    if not partitions:
+        cursor.execute("""
+            SELECT constraint_name FROM information_schema.referential_constraints
+            WHERE constraint_schema = DATABASE() AND table_name = 'appointments'
+        """)
+        for (constraint,) in cursor.fetchall():
+            cursor.execute(f"ALTER TABLE appointments DROP FOREIGN KEY `{constraint}`")
+
+        cursor.execute("SELECT MIN(appointment_date) FROM appointments")
+        first = cursor.fetchone()[0] or date.today()
+        month = month_start(first)
+        clauses = []
+        while month <= last_month:
+            clauses.append(partition_clause(month))
+            month = next_month(month)
+        clauses.append("PARTITION p_future VALUES LESS THAN MAXVALUE")
+
+        # The partitioning column must be part of every unique key
+        cursor.execute("ALTER TABLE appointments DROP PRIMARY KEY, ADD PRIMARY KEY (id, appointment_date)")
+        cursor.execute(
+            "ALTER TABLE appointments PARTITION BY RANGE (TO_DAYS(appointment_date)) ("
+            + ", ".join(clauses) + ")"
+        )
+        print(f"Partitioned appointments into {len(clauses)} partitions")
+        return
+
+    monthly = [name for name in partitions if name != "p_future"]
+    month = next_month(date(int(monthly[-1][1:5]), int(monthly[-1][5:7]), 1))
+    clauses = []
+    while month <= last_month:
+        clauses.append(partition_clause(month))
+        month = next_month(month)
+    if not clauses:
+        print("Partitions already cover the requested months")
+        return
+
+    cursor.execute(
+        "ALTER TABLE appointments REORGANIZE PARTITION p_future INTO ("
+        + ", ".join(clauses) + ", PARTITION p_future VALUES LESS THAN MAXVALUE)"
+    )
+    print(f"Added {len(clauses)} monthly partitions")
+
+
+def archive(db, older_than_days, batch_size):
+    """Move old completed/cancelled appointments to appointments_archive in batches"""
+    cursor = db.cursor()
+    cursor.execute(ARCHIVE_TABLE)
+    cutoff = date.today() - timedelta(days=older_than_days)
+    moved = 0
+
+    while True:
+        cursor.execute(
+            """
+            SELECT id FROM appointments
+            WHERE appointment_date < %s AND status IN (%s, %s)
+            ORDER BY appointment_date
+            LIMIT %s
+            FOR UPDATE
+            """,
+            (cutoff, *ARCHIVED_STATUSES, batch_size)
+        )
+        ids = [row[0] for row in cursor.fetchall()]
+        if not ids:
+            db.commit()
+            break
+
+        placeholders = ", ".join(["%s"] * len(ids))
+        cursor.execute(
+            f"INSERT INTO appointments_archive ({ARCHIVE_COLUMNS}) "
+            f"SELECT {ARCHIVE_COLUMNS} FROM appointments WHERE id IN ({placeholders})",
+            ids
+        )
+        cursor.execute(f"DELETE FROM appointments WHERE id IN ({placeholders})", ids)
+        db.commit()
+        moved += len(ids)
+
+    print(f"Archived {moved} appointments older than {cutoff}")
+
+    # Drop monthly partitions that lie entirely before the cutoff and are now empty
+    for name in existing_partitions(cursor):
+        if name == "p_future" or next_month(date(int(name[1:5]), int(name[5:7]), 1)) > cutoff:
+            continue
+        cursor.execute(f"SELECT COUNT(*) FROM appointments PARTITION ({name})")
+        if cursor.fetchone()[0] == 0:
+            cursor.execute(f"ALTER TABLE appointments DROP PARTITION {name}")
+            print(f"Dropped empty partition {name}")
+
+
+def timed(cursor, query, params, runs=20):
+    """Average latency of a query in milliseconds"""
+    start = time.perf_counter()
+    for _ in range(runs):
+        cursor.execute(query, params)
+        cursor.fetchall()
+    return (time.perf_counter() - start) * 1000 / runs
+
+
+def stats(db, provider_id):
+    """Print partition sizes and hot-path query latency"""
+    cursor = db.cursor()
+    cursor.execute("""
+        SELECT COALESCE(partition_name, '(whole table)'), table_rows, data_length, index_length
+        FROM information_schema.partitions
+        WHERE table_schema = DATABASE() AND table_name = 'appointments'
+        ORDER BY partition_ordinal_position
+    """)
+    print(f"{'Partition':<16}{'Rows':>12}{'Data KB':>12}{'Index KB':>12}")
+    for name, rows, data_length, index_length in cursor.fetchall():
+        print(f"{name:<16}{rows:>12}{data_length // 1024:>12}{index_length // 1024:>12}")
+
+    # The application's own statements, so the timings track what it runs
+    since = date.today() - timedelta(days=ARCHIVE_AFTER_DAYS)
+    listing = timed(cursor, StatementRegistry.STATEMENTS["provider_store"], (provider_id, since))
+    start, end = "09:00:00", "18:00:00"
+    conflict = timed(cursor, StatementRegistry.STATEMENTS["find_conflict"],
+                     (provider_id, date.today(), start, start, end, end, start, end))
+    print(f"Provider listing: {listing:.2f} ms   Conflict check: {conflict:.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Appointments partitioning and archival")
+    parser.add_argument("--salon-id", type=int, help="salon whose shard to use (default SALON_ID)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    partition_parser = commands.add_parser("partition", help="create or extend monthly partitions")
+    partition_parser.add_argument("--months-ahead", type=int, default=3)
+
+    archive_parser = commands.add_parser("archive", help="move old finished appointments to the archive")
+    archive_parser.add_argument("--older-than-days", type=int, default=ARCHIVE_AFTER_DAYS)
+    archive_parser.add_argument("--batch-size", type=int, default=1000)
+
+    stats_parser = commands.add_parser("stats", help="show partition sizes and query latency")
+    stats_parser.add_argument("--provider-id", type=int, default=1)
+
+    args = parser.parse_args()
+    load_dotenv()
+    salon_id = args.salon_id or int(os.getenv("SALON_ID", "1"))
+    db = connect(ShardMap(os.getenv("SHARD_MAP", "shards.json")).shard_for(salon_id))
+    try:
+        if args.command == "partition":
+            partition(db, args.months_ahead)
+        elif args.command == "archive":
+            archive(db, args.older_than_days, args.batch_size)
+        else:
+            stats(db, args.provider_id)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Measure automatic provider assignment decisions per second.
+
+Usage:
+    python benchmark_assignment.py [--providers 50] [--per-day 12] [--decisions 20000]
+
+Builds the day_occupancy rows for one location with --providers providers,
+each with --per-day random 30-60 minute bookings, then times what "Book Any
+Provider" does per decision: reload the day into an OccupancyIndex and rank
+the providers for a random requested time. The query itself is not included
+and no database is needed.
+"""
+import argparse
+import random
+import time
+from datetime import date, time as clock
+
+from salon_app import OccupancyIndex
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Provider assignment benchmark")
+    parser.add_argument("--providers", type=int, default=50)
+    parser.add_argument("--per-day", type=int, default=12)
+    parser.add_argument("--decisions", type=int, default=20000)
+    args = parser.parse_args()
+
+    random.seed(7)
+    day = date.today()
+    rows = []
+    for provider_id in range(1, args.providers + 1):
+        start = 9 * 60
+        for _ in range(args.per_day):
+            start += random.choice((0, 15, 30))
+            end = start + random.choice((30, 45, 60))
+            if end > 20 * 60:
+                break
+            rows.append((provider_id, start, end))
+            start = end
+
+    candidates = [(provider_id, provider_id, random.choice((30, 45, 60)))
+                  for provider_id in range(1, args.providers + 1)]
+    history = {provider_id: random.randint(0, 6) for provider_id in range(1, args.providers + 1, 3)}
+    requests = [clock(random.randint(9, 19), random.choice((0, 15, 30, 45))) for _ in range(args.decisions)]
+
+    occupancy = OccupancyIndex()
+    assigned = 0
+    start = time.perf_counter()
+    for start_clock in requests:
+        occupancy.load_day(day, rows)
+        if occupancy.rank(candidates, day, start_clock, history):
+            assigned += 1
+    elapsed = time.perf_counter() - start
+
+    print(f"{args.decisions} decisions over {args.providers} providers in {elapsed:.3f} s")
+    print(f"{args.decisions / elapsed:,.0f} decisions/s, {assigned} found a free provider")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""Show that ReminderScheduler memory follows its horizon, not the appointments table.
+
+Usage:
+    python benchmark_reminders.py [--appointments 1000000] [--days 365] [--changes 200000]
+
+Spreads synthetic appointments over the coming --days and loads them the way
+the app does: one advance() over the rows of the dates its horizon covers,
+then --changes cancellations and reschedules from other terminals through
+apply(), in batches like a refresh. Prints the heap size and traced memory
+after each step, next to a scheduler whose horizon covers every appointment.
+No database is needed and no reminder is sent.
+"""
+import argparse
+import random
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+from salon_app import ReminderScheduler
+
+OFFSETS = (1440, 60)
+REFRESH_BATCH = 1000
+
+
+def appointments(count, days):
+    """(id, date, start) rows sorted by date, half-hourly from 09:00 to 19:30"""
+    today = datetime.now().date()
+    rows = [(appointment_id, today + timedelta(days=random.randrange(1, days + 1)),
+             timedelta(hours=9, minutes=30 * random.randrange(22)))
+            for appointment_id in range(1, count + 1)]
+    rows.sort(key=lambda row: row[1])
+    return rows
+
+
+def window(rows, scheduler, horizon_end):
+    """Rows the reminder_window statement would return for this advance"""
+    first, last = scheduler.window_dates(horizon_end)
+    return [row for row in rows if first <= row[1] <= last]
+
+
+def measure(label, scheduler, step):
+    start = time.perf_counter()
+    step()
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    print(f"{label:<44}{len(scheduler.heap):>11}{len(scheduler.versions):>10}"
+          f"{current / 2 ** 20:>10.1f}{peak / 2 ** 20:>10.1f}{elapsed:>9.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reminder scheduler memory benchmark")
+    parser.add_argument("--appointments", type=int, default=1000000)
+    parser.add_argument("--days", type=int, default=365)
+    parser.add_argument("--changes", type=int, default=200000)
+    args = parser.parse_args()
+
+    random.seed(7)
+    rows = appointments(args.appointments, args.days)
+    print(f"{args.appointments} appointments over {args.days} days, reminders {OFFSETS} minutes before\n")
+    print(f"{'Step':<44}{'Heap':>11}{'Versions':>10}{'MiB':>10}{'Peak MiB':>10}{'Seconds':>9}")
+
+    tracemalloc.start()
+    scheduler = ReminderScheduler(OFFSETS, "unused.jsonl")
+    horizon_end = datetime.now() + scheduler.horizon
+    measure(f"Load {scheduler.horizon.days}-day horizon", scheduler,
+            lambda: scheduler.advance(window(rows, scheduler, horizon_end), horizon_end))
+
+    def churn():
+        # Half the changes touch appointments inside the horizon, as same-week edits do
+        near = [row for row in rows if row[1] <= horizon_end.date()]
+        for _ in range(args.changes // REFRESH_BATCH):
+            batch = []
+            for _ in range(REFRESH_BATCH):
+                appointment_id, day, start = random.choice(near) if random.random() < 0.5 else random.choice(rows)
+                if random.random() < 0.3:
+                    batch.append((appointment_id, None, None, "cancelled"))
+                else:
+                    batch.append((appointment_id, day, timedelta(hours=9, minutes=30 * random.randrange(22)),
+                                  "confirmed"))
+            scheduler.apply(batch)
+
+    measure(f"Apply {args.changes} changes in batches of {REFRESH_BATCH}", scheduler, churn)
+    tracemalloc.stop()
+    del scheduler
+
+    tracemalloc.start()
+    everything = ReminderScheduler(OFFSETS, "unused.jsonl", horizon=timedelta(days=args.days + 2))
+    horizon_end = datetime.now() + everything.horizon
+    measure("For comparison: horizon covering every row", everything,
+            lambda: everything.advance(window(rows, everything, horizon_end), horizon_end))
+    tracemalloc.stop()
+
+
+if __name__ == "__main__":
+    main()
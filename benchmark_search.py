@@ -0,0 +1,84 @@
+"""Measure ServiceSearchIndex build time and query latency on a large catalog.
+
+Usage:
+    python benchmark_search.py [--services 100000] [--providers 5000] [--runs 50]
+
+Builds a synthetic catalog shaped like the load_services statement (service
+names, provider usernames, locations from locations.csv and short
+descriptions), indexes it, then times typical search-box queries: prefixes
+while typing, whole words, multi-word and misspelled/compacted names, alone
+and with the dashboard's location and service type filters. No database is
+needed.
+"""
+import argparse
+import random
+import time
+
+from salon_app import GEOCODES, ServiceSearchIndex
+
+SERVICE_NAMES = (
+    "Hair Cut & Style", "Hair Colour", "Hair Spa", "Keratin Treatment", "Blow Dry",
+    "Beard Trim", "Shave", "Bridal Makeup", "Party Makeup", "Manicure", "Pedicure",
+    "Gel Nails", "Nail Art", "Facial", "Cleanup", "Threading", "Waxing", "Body Massage",
+    "Head Massage", "Hair Straightening", "Hair Smoothening", "Highlights", "Mehendi",
+    "Eyelash Extensions", "Skin Polishing", "De-Tan", "Scalp Treatment", "Kids Haircut"
+)
+DESCRIPTION_WORDS = (
+    "relaxing", "premium", "organic", "quick", "deluxe", "classic", "express", "signature",
+    "luxury", "herbal", "gentle", "deep", "hydrating", "professional", "styling", "care",
+    "treatment", "session", "finish", "look", "wash", "trim", "shine", "glow"
+)
+QUERIES = ("ha", "hair", "haircut", "hair cut", "bridal makeup", "massage", "pedicure",
+           "keratin", "bridl makup", "andheri hair", "organic facial")
+
+
+def catalog(services, providers):
+    locations = sorted(GEOCODES)
+    provider_rows = [(provider_id, f"stylist{provider_id}", random.choice(locations))
+                     for provider_id in range(1, providers + 1)]
+    rows = []
+    for service_id in range(1, services + 1):
+        provider_id, username, location = random.choice(provider_rows)
+        rows.append((
+            service_id, random.choice(SERVICE_NAMES), username,
+            random.randrange(200, 5000, 50), random.choice((30, 45, 60, 90)), location,
+            " ".join(random.sample(DESCRIPTION_WORDS, 6)), provider_id
+        ))
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Service search benchmark")
+    parser.add_argument("--services", type=int, default=100000)
+    parser.add_argument("--providers", type=int, default=5000)
+    parser.add_argument("--runs", type=int, default=50)
+    args = parser.parse_args()
+
+    random.seed(7)
+    rows = catalog(args.services, args.providers)
+
+    index = ServiceSearchIndex()
+    start = time.perf_counter()
+    index.build(rows)
+    print(f"Built index over {len(rows)} services in {(time.perf_counter() - start) * 1000:.0f} ms")
+
+    location = sorted(GEOCODES)[0]
+    searches = [(query, query, None) for query in QUERIES] + [
+        (f"hair @ {location}", "hair", {5: location}),
+        ("haircut @ Hair Cut & Style", "haircut", {1: "Hair Cut & Style"}),
+    ]
+    print(f"{'Query':<30}{'Results':>9}{'Mean ms':>10}{'Max ms':>9}")
+    worst = 0.0
+    for label, query, filters in searches:
+        timings = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            results = index.search(query, filters=filters)
+            timings.append((time.perf_counter() - start) * 1000)
+        worst = max(worst, max(timings))
+        print(f"{label[:29]:<30}{len(results):>9}{sum(timings) / len(timings):>10.2f}{max(timings):>9.2f}")
+    print(f"\nSlowest single query: {worst:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Compare plain text queries with the prepared StatementRegistry.
+
+Usage:
+    python benchmark_statements.py [--runs 500] [--provider-id 1] [--customer-id 1] [--salon-id 1]
+
+Each hot statement is run --runs times through a plain cursor (full SQL text
+sent and parsed per call) and through StatementRegistry (prepared once, then
+only parameters are sent). Prints per-call latency, the server's prepare/
+execute counters and the registry's reuse counts.
+"""
+import argparse
+import os
+import time
+from datetime import date, timedelta
+
+from dotenv import load_dotenv
+
+from salon_app import ShardMap, StatementRegistry, LISTING_HISTORY_DAYS
+from tenancy import connect
+
+
+def session_counters(cursor):
+    cursor.execute(
+        "SHOW SESSION STATUS WHERE Variable_name IN "
+        "('Com_select', 'Com_stmt_prepare', 'Com_stmt_execute', 'Questions')"
+    )
+    return {name: int(value) for name, value in cursor.fetchall()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Prepared statement benchmark")
+    parser.add_argument("--runs", type=int, default=500)
+    parser.add_argument("--provider-id", type=int, default=1)
+    parser.add_argument("--customer-id", type=int, default=1)
+    parser.add_argument("--salon-id", type=int, default=1)
+    args = parser.parse_args()
+
+    today = date.today()
+    since = today - timedelta(days=LISTING_HISTORY_DAYS)
+    workload = {
+        "login": (args.salon_id, "nobody", "0" * 64, "customer"),
+        "load_services": (args.salon_id,),
+        "filter_services_location_type": (args.salon_id, "Andheri", "Hair Cut"),
+        "service_booking_info": (1,),
+        "find_conflict": (args.provider_id, today, "10:00:00", "10:00:00", "10:30:00",
+                          "10:30:00", "10:00:00", "10:30:00"),
+        "customer_appointments": (args.customer_id, since),
+        "provider_store": (args.provider_id, since)
+    }
+
+    load_dotenv()
+    db = connect(ShardMap(os.getenv("SHARD_MAP", "shards.json")).shard_for(args.salon_id))
+    stats_cursor = db.cursor()
+    text_cursor = db.cursor()
+    registry = StatementRegistry(db)
+
+    print(f"{'Statement':<32}{'Text ms':>10}{'Prepared ms':>14}{'Saved':>8}")
+    for name, params in workload.items():
+        sql = StatementRegistry.STATEMENTS[name]
+
+        start = time.perf_counter()
+        for _ in range(args.runs):
+            text_cursor.execute(sql, params)
+            text_cursor.fetchall()
+        text_ms = (time.perf_counter() - start) * 1000 / args.runs
+
+        start = time.perf_counter()
+        for _ in range(args.runs):
+            registry.fetchall(name, params)
+        prepared_ms = (time.perf_counter() - start) * 1000 / args.runs
+
+        saved = (1 - prepared_ms / text_ms) * 100 if text_ms else 0
+        print(f"{name:<32}{text_ms:>10.3f}{prepared_ms:>14.3f}{saved:>7.1f}%")
+
+    before = session_counters(stats_cursor)
+    for name, params in workload.items():
+        registry.fetchall(name, params)
+    after = session_counters(stats_cursor)
+    print("\nServer counters for one more pass through the registry:")
+    for counter in sorted(after):
+        print(f"  {counter}: +{after[counter] - before[counter]}")
+
+    print("\nRegistry reuse counts:")
+    for name, reused in sorted(registry.reuse_counts().items()):
+        print(f"  {name}: {reused}")
+
+    registry.close()
+    db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""Compare the columnar AppointmentStore with rows as fetched from MySQL.
+
+Usage:
+    python benchmark_store.py [--appointments 200000] [--providers 100]
+
+Builds the same synthetic appointments as a list of (id, provider_id,
+customer_id, service_id, date, timedelta, timedelta, str) tuples and as an
+AppointmentStore. Prints bytes per appointment for each, and the time for a
+provider day listing and a conflict check.
+"""
+import argparse
+import random
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+from salon_app import AppointmentStore, STATUS_NAMES
+
+
+def timed(function, runs=50):
+    start = time.perf_counter()
+    for _ in range(runs):
+        function()
+    return (time.perf_counter() - start) * 1000 / runs
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Appointment store benchmark")
+    parser.add_argument("--appointments", type=int, default=200000)
+    parser.add_argument("--providers", type=int, default=100)
+    args = parser.parse_args()
+
+    random.seed(7)
+    first_day = date.today()
+
+    tracemalloc.start()
+    rows = []
+    for appointment_id in range(1, args.appointments + 1):
+        start = timedelta(minutes=random.randrange(9 * 60, 19 * 60, 15))
+        rows.append((
+            appointment_id, random.randint(1, args.providers), random.randint(1, 5000),
+            random.randint(1, 500), first_day + timedelta(days=random.randint(0, 90)),
+            start, start + timedelta(minutes=30), random.choice(STATUS_NAMES)
+        ))
+    tuple_bytes = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    store = AppointmentStore()
+    store.load(rows)
+
+    day = first_day + timedelta(days=10)
+    provider_id = 1
+
+    def tuple_listing():
+        return sorted((r for r in rows if r[1] == provider_id and r[4] == day), key=lambda r: r[5])
+
+    def tuple_conflict():
+        start, end = timedelta(hours=12), timedelta(hours=12, minutes=30)
+        return any(r[1] == provider_id and r[4] == day and r[7] != "cancelled"
+                   and r[5] < end and r[6] > start for r in rows)
+
+    print(f"{args.appointments} appointments")
+    print(f"Tuples: {tuple_bytes / args.appointments:8.1f} bytes/appointment")
+    used = sum(column.itemsize for column in store.columns.values())
+    print(f"Store:  {used:8.1f} bytes/appointment "
+          f"({store.nbytes / len(store):.1f} including spare capacity)")
+    print(f"Day listing    tuples {timed(tuple_listing):8.3f} ms   "
+          f"store {timed(lambda: store.provider_rows(provider_id, day, day)):8.3f} ms")
+    print(f"Conflict check tuples {timed(tuple_conflict):8.3f} ms   "
+          f"store {timed(lambda: store.has_conflict(provider_id, day, 720, 750)):8.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+"""Provider schedules at any point in time, from snapshots plus the event log.
+
+Usage:
+    python event_log.py init
+    python event_log.py [--salon-id 1] snapshot [--provider-id 7]
+    python event_log.py replay --provider-id 7 [--at "2026-10-18 12:00"] [--from 2026-10-18] [--to 2026-10-25]
+    python event_log.py history --appointment-id 42
+
+`init` creates the appointment_events and schedule_snapshots tables on an
+existing database (new databases get them from schema.sql).
+
+`snapshot` stores each provider's current appointments from a consistent
+read; schedule it nightly so a replay only has to apply one day of events.
+
+`replay` starts from the provider's latest snapshot taken at or before --at
+and applies the appointment events recorded after it, printing the schedule
+as it stood at that moment.
+
+`history` prints every recorded change to one appointment.
+"""
+import argparse
+import json
+import os
+import time
+from datetime import date, datetime, timedelta
+
+from dotenv import load_dotenv
+
+from salon_app import EventLog, ShardMap
+from tenancy import connect
+
+# Events committed just before a snapshot's read may carry a slightly earlier
+# timestamp, so replay re-applies this much history. After-images are applied
+# in id order, which makes re-applying an event already in the snapshot harmless.
+SNAPSHOT_OVERLAP = timedelta(minutes=5)
+
+TABLES = (
+    """
+    CREATE TABLE IF NOT EXISTS appointment_events (
+        id BIGINT AUTO_INCREMENT PRIMARY KEY,
+        salon_id INT NOT NULL,
+        entity ENUM('appointment', 'service') NOT NULL,
+        entity_id INT NOT NULL,
+        provider_id INT NOT NULL,
+        action VARCHAR(20) NOT NULL,
+        before_image JSON NULL,
+        after_image JSON NULL,
+        recorded_at TIMESTAMP(6) DEFAULT CURRENT_TIMESTAMP(6),
+        INDEX idx_events_provider_time (provider_id, recorded_at),
+        INDEX idx_events_entity (entity, entity_id)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS schedule_snapshots (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        provider_id INT NOT NULL,
+        taken_at TIMESTAMP(6) NOT NULL,
+        appointments JSON NOT NULL,
+        INDEX idx_snapshots_provider_time (provider_id, taken_at)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """
+)
+
+
+def init(db):
+    cursor = db.cursor()
+    for statement in TABLES:
+        cursor.execute(statement)
+    print("Event log tables are in place")
+
+
+def snapshot(db, salon_id, provider_id):
+    """Store the current schedule of one provider, or of every provider in the salon"""
+    cursor = db.cursor()
+    if provider_id:
+        providers = [provider_id]
+    else:
+        cursor.execute("SELECT id FROM users WHERE salon_id = %s AND user_type = 'provider'", (salon_id,))
+        providers = [row[0] for row in cursor.fetchall()]
+
+    columns = ", ".join(EventLog.APPOINTMENT_COLUMNS)
+    for provider in providers:
+        # Read the clock before the snapshot so taken_at never claims more than it holds
+        cursor.execute("SELECT NOW(6)")
+        taken_at = cursor.fetchone()[0]
+        db.commit()
+
+        db.start_transaction(consistent_snapshot=True)
+        cursor.execute(f"SELECT {columns} FROM appointments WHERE provider_id = %s", (provider,))
+        images = [EventLog.image(EventLog.APPOINTMENT_COLUMNS, row) for row in cursor.fetchall()]
+        cursor.execute(
+            "INSERT INTO schedule_snapshots (provider_id, taken_at, appointments) VALUES (%s, %s, %s)",
+            (provider, taken_at, json.dumps(images))
+        )
+        db.commit()
+        print(f"Provider {provider}: {len(images)} appointments at {taken_at}")
+
+
+def rebuild(cursor, provider_id, at):
+    """Schedule as {appointment_id: image} at `at`, or None without an earlier snapshot.
+
+    Returns (snapshot taken_at, events applied, schedule).
+    """
+    cursor.execute(
+        """
+        SELECT taken_at, appointments FROM schedule_snapshots
+        WHERE provider_id = %s AND taken_at <= %s
+        ORDER BY taken_at DESC
+        LIMIT 1
+        """,
+        (provider_id, at)
+    )
+    row = cursor.fetchone()
+    if not row:
+        return None
+    taken_at, images = row
+    schedule = {image["id"]: image for image in json.loads(images)}
+
+    cursor.execute(
+        """
+        SELECT entity_id, after_image FROM appointment_events
+        WHERE provider_id = %s
+        AND recorded_at > %s AND recorded_at <= %s
+        AND entity = 'appointment'
+        ORDER BY id
+        """,
+        (provider_id, taken_at - SNAPSHOT_OVERLAP, at)
+    )
+    events = cursor.fetchall()
+    for appointment_id, after in events:
+        if after is None:
+            schedule.pop(appointment_id, None)
+        else:
+            schedule[appointment_id] = json.loads(after)
+    return taken_at, len(events), schedule
+
+
+def replay(db, provider_id, at, first_day, last_day):
+    start = time.perf_counter()
+    result = rebuild(db.cursor(), provider_id, at)
+    elapsed = (time.perf_counter() - start) * 1000
+    if result is None:
+        print(f"No snapshot of provider {provider_id} at or before {at}; run `snapshot` first")
+        return
+
+    taken_at, applied, schedule = result
+    rows = sorted(
+        (image for image in schedule.values()
+         if (not first_day or image["appointment_date"] >= first_day.isoformat())
+         and (not last_day or image["appointment_date"] <= last_day.isoformat())),
+        key=lambda image: (image["appointment_date"], image["start_time"])
+    )
+    print(f"{'ID':>8}  {'Date':<12}{'Start':<10}{'End':<10}{'Customer':>10}{'Service':>9}  Status")
+    for image in rows:
+        print(f"{image['id']:>8}  {image['appointment_date']:<12}{image['start_time']:<10}"
+              f"{image['end_time']:<10}{image['customer_id']:>10}{image['service_id']:>9}  {image['status']}")
+    print(f"\nProvider {provider_id} at {at}: snapshot of {taken_at} + {applied} events "
+          f"in {elapsed:.1f} ms ({len(rows)} shown)")
+
+
+def history(db, appointment_id):
+    cursor = db.cursor()
+    cursor.execute(
+        """
+        SELECT recorded_at, action, before_image, after_image FROM appointment_events
+        WHERE entity = 'appointment' AND entity_id = %s
+        ORDER BY id
+        """,
+        (appointment_id,)
+    )
+    events = cursor.fetchall()
+    if not events:
+        print(f"No events recorded for appointment {appointment_id}")
+    for recorded_at, action, before, after in events:
+        before = json.loads(before) if before else {}
+        after = json.loads(after) if after else {}
+        if before and after:
+            changes = ", ".join(
+                f"{column}: {before[column]} -> {after[column]}"
+                for column in EventLog.APPOINTMENT_COLUMNS if before[column] != after[column]
+            )
+        else:
+            image = after or before
+            changes = f"{image['appointment_date']} {image['start_time']}-{image['end_time']} ({image['status']})"
+        print(f"{recorded_at}  {action:<12}{changes}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Appointment event log tools")
+    parser.add_argument("--salon-id", type=int, help="salon whose shard to use (default SALON_ID)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("init", help="create the event log tables")
+
+    snapshot_parser = commands.add_parser("snapshot", help="store current provider schedules")
+    snapshot_parser.add_argument("--provider-id", type=int)
+
+    replay_parser = commands.add_parser("replay", help="rebuild a provider schedule at a point in time")
+    replay_parser.add_argument("--provider-id", type=int, required=True)
+    replay_parser.add_argument("--at", type=datetime.fromisoformat, default=datetime.now())
+    replay_parser.add_argument("--from", dest="first_day", type=date.fromisoformat)
+    replay_parser.add_argument("--to", dest="last_day", type=date.fromisoformat)
+
+    history_parser = commands.add_parser("history", help="show every change to an appointment")
+    history_parser.add_argument("--appointment-id", type=int, required=True)
+
+    args = parser.parse_args()
+    load_dotenv()
+    salon_id = args.salon_id or int(os.getenv("SALON_ID", "1"))
+    db = connect(ShardMap(os.getenv("SHARD_MAP", "shards.json")).shard_for(salon_id))
+    try:
+        if args.command == "init":
+            init(db)
+        elif args.command == "snapshot":
+            snapshot(db, salon_id, args.provider_id)
+        elif args.command == "replay":
+            replay(db, args.provider_id, args.at, args.first_day, args.last_day)
+        else:
+            history(db, args.appointment_id)
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
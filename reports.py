@@ -0,0 +1,205 @@
+"""End-of-day provider summaries and customer invoices.
+
+Usage:
+    python reports.py [--date 2026-10-18] [--salon-id 1] [--format html|pdf]
+                      [--out reports] [--workers 4]
+
+Pulls the day's completed appointments with their service prices in one
+query, then renders one summary per provider and one invoice per customer in
+a process pool, so close-of-day runs off the front desk terminal. Each worker
+writes its document straight to disk and only the path comes back; the
+manifest (index.csv) is appended to as documents finish.
+
+Output goes to <out>/<date>/salon-<id>/{providers,invoices}/.
+"""
+import argparse
+import csv
+import html
+import os
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+from dotenv import load_dotenv
+
+COMPLETED_QUERY = """
+    SELECT a.id, a.provider_id, p.name, a.customer_id, c.name, c.email, c.phone,
+        s.service_name, s.price, a.start_time, a.end_time
+    FROM appointments a
+    JOIN services s ON a.service_id = s.id
+    JOIN users p ON a.provider_id = p.id
+    JOIN users c ON a.customer_id = c.id
+    WHERE a.salon_id = %s
+    AND a.appointment_date = %s
+    AND a.status = 'completed'
+    ORDER BY a.start_time, a.id
+"""
+
+PAGE = """<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>{title}</title>
+<style>
+body {{ font-family: Helvetica, Arial, sans-serif; color: #333; margin: 40px; }}
+h1 {{ color: #ff6b81; }}
+table {{ border-collapse: collapse; width: 100%; }}
+th, td {{ border-bottom: 1px solid #eee; padding: 6px; text-align: left; }}
+td.amount, th.amount {{ text-align: right; }}
+tfoot td {{ font-weight: bold; }}
+</style></head>
+<body>
+<h1>{title}</h1>
+{details}
+<table>
+<thead><tr>{header}</tr></thead>
+<tbody>
+{rows}
+</tbody>
+<tfoot><tr><td colspan="{span}">Total</td><td class="amount">{total}</td></tr></tfoot>
+</table>
+</body></html>
+"""
+
+
+def clock(value):
+    """TIME columns arrive as timedelta; documents show HH:MM"""
+    minutes = int(value.total_seconds()) // 60
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def build_jobs(rows, day, salon_id, salon_name, out_dir, fmt):
+    """Group the day's rows into one job per provider summary and per customer invoice.
+
+    Jobs are plain tuples of str/float so they pickle cheaply to the workers.
+    """
+    providers = defaultdict(list)
+    customers = defaultdict(list)
+    contact = {}
+    for (appointment_id, provider_id, provider, customer_id, customer, email, phone,
+         service, price, start, end) in rows:
+        line = (clock(start), clock(end), service, float(price))
+        providers[(provider_id, provider)].append(line[:2] + (customer,) + line[2:])
+        customers[(customer_id, customer)].append(line[:2] + (provider,) + line[2:])
+        contact[customer_id] = " · ".join(filter(None, (email, phone)))
+
+    heading = f"{salon_name} · {day:%d %B %Y}"
+    jobs = []
+    for (provider_id, provider), lines in providers.items():
+        path = os.path.join(out_dir, "providers", f"provider-{provider_id}.{fmt}")
+        jobs.append(("summary", path, fmt, f"Day summary: {provider}", heading, lines))
+    for (customer_id, customer), lines in customers.items():
+        number = f"INV-{day:%Y%m%d}-{salon_id}-{customer_id}"
+        path = os.path.join(out_dir, "invoices", f"{number}.{fmt}")
+        details = f"Invoice {number} · {heading}\nBilled to {customer}" + (
+            f" ({contact[customer_id]})" if contact[customer_id] else "")
+        jobs.append(("invoice", path, fmt, f"Invoice for {customer}", details, lines))
+    return jobs
+
+
+def render_html(path, title, details, header, lines):
+    rows = "\n".join(
+        "<tr>" + "".join(f"<td>{html.escape(str(cell))}</td>" for cell in line[:-1])
+        + f'<td class="amount">{line[-1]:.2f}</td></tr>'
+        for line in lines
+    )
+    page = PAGE.format(
+        title=html.escape(title),
+        details="".join(f"<p>{html.escape(text)}</p>" for text in details.split("\n")),
+        header="".join(f"<th>{name}</th>" for name in header[:-1]) + f'<th class="amount">{header[-1]}</th>',
+        rows=rows,
+        span=len(header) - 1,
+        total=f"{sum(line[-1] for line in lines):.2f}"
+    )
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(page)
+
+
+def render_pdf(path, title, details, header, lines):
+    # Figure without pyplot: no GUI backend or global figure state in the workers
+    from matplotlib.figure import Figure
+
+    cells = [list(line[:-1]) + [f"{line[-1]:.2f}"] for line in lines]
+    cells.append(["Total"] + [""] * (len(header) - 2) + [f"{sum(line[-1] for line in lines):.2f}"])
+
+    figure = Figure(figsize=(8.27, 11.69))  # A4 portrait
+    figure.text(0.08, 0.95, title, fontsize=16, color="#ff6b81", weight="bold")
+    figure.text(0.08, 0.92, details, fontsize=9, va="top")
+    axes = figure.add_axes([0.08, 0.05, 0.84, 0.82])
+    axes.axis("off")
+    table = axes.table(cellText=cells, colLabels=header, loc="upper left", cellLoc="left")
+    table.auto_set_font_size(False)
+    table.set_fontsize(8)
+    figure.savefig(path, format="pdf")
+
+
+def render_document(job):
+    """Worker entry point: render one job to a temporary file and move it into place"""
+    kind, path, fmt, title, details, lines = job
+    if kind == "summary":
+        header = ("Start", "End", "Customer", "Service", "Price")
+    else:
+        header = ("Start", "End", "Provider", "Service", "Amount")
+
+    partial = path + ".part"
+    if fmt == "pdf":
+        render_pdf(partial, title, details, header, lines)
+    else:
+        render_html(partial, title, details, header, lines)
+    os.replace(partial, path)  # Readers never see a half-written document
+    return kind, path, len(lines), sum(line[-1] for line in lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-of-day summaries and invoices")
+    parser.add_argument("--date", dest="day", type=date.fromisoformat, default=date.today())
+    parser.add_argument("--salon-id", type=int)
+    parser.add_argument("--format", choices=("html", "pdf"), default="html")
+    parser.add_argument("--out", default="reports")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args()
+
+    # Imported here so worker processes only load this module, not the Tk app
+    from salon_app import ShardMap
+    from tenancy import connect
+
+    load_dotenv()
+    salon_id = args.salon_id or int(os.getenv("SALON_ID", "1"))
+    db = connect(ShardMap(os.getenv("SHARD_MAP", "shards.json")).shard_for(salon_id))
+    try:
+        cursor = db.cursor()
+        cursor.execute("SELECT name FROM salons WHERE id = %s", (salon_id,))
+        salon_name = (cursor.fetchone() or (f"Salon {salon_id}",))[0]
+        cursor.execute(COMPLETED_QUERY, (salon_id, args.day))
+        rows = cursor.fetchall()
+    finally:
+        db.close()
+
+    out_dir = os.path.join(args.out, args.day.isoformat(), f"salon-{salon_id}")
+    for folder in ("providers", "invoices"):
+        os.makedirs(os.path.join(out_dir, folder), exist_ok=True)
+
+    jobs = build_jobs(rows, args.day, salon_id, salon_name, out_dir, args.format)
+    if not jobs:
+        print(f"No completed appointments on {args.day} for {salon_name}")
+        return
+
+    start = time.perf_counter()
+    revenue = 0.0
+    with open(os.path.join(out_dir, "index.csv"), "w", newline="", encoding="utf-8") as f, \
+            ProcessPoolExecutor(max_workers=args.workers) as pool:
+        manifest = csv.writer(f)
+        manifest.writerow(["kind", "path", "appointments", "total"])
+        # Small chunks keep the workers busy without one straggler holding the tail
+        chunksize = max(1, len(jobs) // (args.workers * 8))
+        for kind, path, count, total in pool.map(render_document, jobs, chunksize=chunksize):
+            manifest.writerow([kind, os.path.relpath(path, out_dir), count, f"{total:.2f}"])
+            if kind == "summary":
+                revenue += total
+
+    elapsed = time.perf_counter() - start
+    print(f"{len(jobs)} documents for {len(rows)} appointments in {elapsed:.1f} s "
+          f"({len(jobs) / elapsed * 60:.0f}/min), revenue {revenue:.2f}")
+    print(f"Written to {out_dir}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,1571 @@
 import tkinter as tk
 from tkinter import ttk, messagebox
 import mysql.connector
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
+import numpy as np
 import matplotlib.pyplot as plt
 from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 import hashlib
+import sqlite3
+import json
+import threading
 from tkcalendar import Calendar
 import os
+import re
+import time
+import csv
+import math
+import heapq
+from bisect import bisect_left
+from collections import Counter, defaultdict
 from dotenv import load_dotenv
 
+
+# Legal appointment status transitions; completed and cancelled are final.
+# Walk-ins are often served without being confirmed first, so pending can complete.
+STATUS_TRANSITIONS = {
+    "pending": {"confirmed", "completed", "cancelled"},
+    "confirmed": {"completed", "cancelled"},
+    "completed": set(),
+    "cancelled": set()
+}
+
+# Overlap rule shared by the server and local replica conflict checks.
+# Bind parameters as (start, start, end, end, start, end).
+OVERLAP_CONDITION = """(
+                (start_time <= {p} AND end_time > {p}) OR
+                (start_time < {p} AND end_time >= {p}) OR
+                (start_time >= {p} AND end_time <= {p})
+            )"""
+
+# Offline mode: how often to retry the server and how many queued bookings to replay per transaction
+RECONNECT_INTERVAL_MS = 30000
+OUTBOX_BATCH_SIZE = 50
+
+# Reminders are off unless REMINDER_OFFSETS_MINUTES is set; enable them on one
+# terminal per salon so customers are not reminded once per terminal
+DEFAULT_REMINDER_OFFSETS = ""
+# How often appointment changes from every terminal are applied, and how often the horizon moves forward
+REMINDER_REFRESH_MS = 60 * 1000
+REMINDER_ADVANCE = timedelta(hours=1)
+# Event ids are assigned just before commit, so a slower transaction can commit
+# a lower id after a poll has moved past it; each poll re-reads this many ids
+REMINDER_EVENT_OVERLAP = 1000
+
+# Listings only look this far back so MySQL can prune old appointment partitions;
+# finished appointments older than this are moved out by archive_appointments.py
+LISTING_HISTORY_DAYS = 180
+
+# Bookable hours in minutes since midnight: bookings must start and finish
+# inside them, and the provider calendar grid covers them
+BOOKABLE_START = 8 * 60
+BOOKABLE_END = 21 * 60
+
+# Status codes used by the columnar AppointmentStore
+STATUS_NAMES = ("pending", "confirmed", "completed", "cancelled")
+STATUS_CODES = {name: code for code, name in enumerate(STATUS_NAMES)}
+
+EARTH_RADIUS_KM = 6371.0
+NEAREST_PROVIDERS = 10
+
+# Tables added after the first release, created on startup if missing (same as schema.sql)
+WAITLIST_TABLE = """
+    CREATE TABLE IF NOT EXISTS waitlist (
+        id INT AUTO_INCREMENT PRIMARY KEY,
+        salon_id INT NOT NULL DEFAULT 1,
+        customer_id INT NOT NULL,
+        service_id INT NOT NULL,
+        provider_id INT NOT NULL,
+        requested_date DATE NOT NULL,
+        requested_start TIME NOT NULL,
+        requested_end TIME NOT NULL,
+        status ENUM('waiting', 'booked') DEFAULT 'waiting',
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (customer_id) REFERENCES users(id) ON DELETE CASCADE,
+        FOREIGN KEY (service_id) REFERENCES services(id) ON DELETE CASCADE,
+        FOREIGN KEY (provider_id) REFERENCES users(id) ON DELETE CASCADE,
+        INDEX idx_waitlist_match (provider_id, requested_date, status, requested_start)
+    ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+"""
+
+
+def load_geocodes(path):
+    """Read the bundled location -> (latitude, longitude) lookup table"""
+    geocodes = {}
+    try:
+        with open(path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                geocodes[row["location"].strip()] = (float(row["latitude"]), float(row["longitude"]))
+    except OSError:
+        pass
+    return geocodes
+
+
+GEOCODES = load_geocodes(os.path.join(os.path.dirname(os.path.abspath(__file__)), "locations.csv"))
+GEOCODES_LOWER = {name.lower(): coords for name, coords in GEOCODES.items()}
+
+
+def within_bookable_hours(start_datetime, end_datetime):
+    """Whether a booking from start_datetime to end_datetime fits in one day's bookable hours"""
+    start = start_datetime.hour * 60 + start_datetime.minute
+    end = end_datetime.hour * 60 + end_datetime.minute
+    return start_datetime.date() == end_datetime.date() and BOOKABLE_START <= start and end <= BOOKABLE_END
+
+
+def bookable_hours_text():
+    return (f"{BOOKABLE_START // 60:02d}:{BOOKABLE_START % 60:02d} and "
+            f"{BOOKABLE_END // 60:02d}:{BOOKABLE_END % 60:02d}")
+
+
+def geocode(location):
+    """Offline geocoding of a free-text location, None if it is not in the lookup table"""
+    return GEOCODES_LOWER.get((location or "").strip().lower())
+
+
+class ProviderLocator:
+    """k-d tree over provider coordinates for nearest-provider and radius lookups"""
+
+    def __init__(self):
+        self.root = None
+
+    @staticmethod
+    def to_point(latitude, longitude):
+        """Project onto the unit sphere so chord length orders like great-circle distance"""
+        lat, lon = math.radians(latitude), math.radians(longitude)
+        return (math.cos(lat) * math.cos(lon), math.cos(lat) * math.sin(lon), math.sin(lat))
+
+    @staticmethod
+    def chord_to_km(chord):
+        return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, chord / 2))
+
+    @staticmethod
+    def km_to_chord(km):
+        return 2 * math.sin(min(math.pi / 2, km / (2 * EARTH_RADIUS_KM)))
+
+    def build(self, providers):
+        """Index rows of (provider_id, latitude, longitude)"""
+        points = [(self.to_point(lat, lon), provider_id) for provider_id, lat, lon in providers]
+        self.root = self._build(points, 0)
+
+    def _build(self, points, depth):
+        if not points:
+            return None
+        axis = depth % 3
+        points.sort(key=lambda p: p[0][axis])
+        mid = len(points) // 2
+        return (points[mid][0], points[mid][1], axis,
+                self._build(points[:mid], depth + 1),
+                self._build(points[mid + 1:], depth + 1))
+
+    @staticmethod
+    def _dist2(a, b):
+        return (a[0] - b[0]) ** 2 + (a[1] - b[1]) ** 2 + (a[2] - b[2]) ** 2
+
+    def nearest(self, latitude, longitude, k=NEAREST_PROVIDERS, candidates=None):
+        """Return the k closest providers as (provider_id, km), nearest first.
+
+        With `candidates`, only providers in that set are counted, so filters
+        applied before the lookup still yield k providers when enough match.
+        """
+        target = self.to_point(latitude, longitude)
+        best = []  # Max-heap of (-dist2, provider_id)
+
+        def visit(node):
+            if node is None:
+                return
+            point, provider_id, axis, left, right = node
+            d2 = self._dist2(point, target)
+            if candidates is None or provider_id in candidates:
+                if len(best) < k:
+                    heapq.heappush(best, (-d2, provider_id))
+                elif d2 < -best[0][0]:
+                    heapq.heapreplace(best, (-d2, provider_id))
+
+            diff = target[axis] - point[axis]
+            near, far = (left, right) if diff < 0 else (right, left)
+            visit(near)
+            if len(best) < k or diff * diff < -best[0][0]:
+                visit(far)
+
+        visit(self.root)
+        matches = [(provider_id, self.chord_to_km(math.sqrt(-d2))) for d2, provider_id in best]
+        return sorted(matches, key=lambda match: match[1])
+
+    def within(self, latitude, longitude, radius_km):
+        """Return providers within radius_km as (provider_id, km), nearest first"""
+        target = self.to_point(latitude, longitude)
+        r2 = self.km_to_chord(radius_km) ** 2
+        matches = []
+
+        def visit(node):
+            if node is None:
+                return
+            point, provider_id, axis, left, right = node
+            d2 = self._dist2(point, target)
+            if d2 <= r2:
+                matches.append((provider_id, self.chord_to_km(math.sqrt(d2))))
+
+            diff = target[axis] - point[axis]
+            near, far = (left, right) if diff < 0 else (right, left)
+            visit(near)
+            if diff * diff <= r2:
+                visit(far)
+
+        visit(self.root)
+        return sorted(matches, key=lambda match: match[1])
+
+
+class StatementRegistry:
+    """Server-side prepared statements for the hot queries, prepared once per connection"""
+
+    SERVICE_COLUMNS = """
+        SELECT s.id, s.service_name, u.username, s.price, s.duration, u.location
+        FROM services s
+        JOIN users u ON s.provider_id = u.id
+    """
+
+    STATEMENTS = {
+        # Catalog and user statements take the salon id first, matching the
+        # salon-leading composite indexes in schema.sql
+        "login": """
+            SELECT id, name, user_type FROM users
+            WHERE salon_id = %s AND username = %s AND password = %s AND user_type = %s
+        """,
+        "load_services": """
+            SELECT s.id, s.service_name, u.username, s.price, s.duration, u.location,
+                s.description, s.provider_id
+            FROM services s
+            JOIN users u ON s.provider_id = u.id
+            WHERE s.salon_id = %s
+        """,
+        # filter_services only ever uses one of these four shapes
+        "filter_services": SERVICE_COLUMNS + " WHERE s.salon_id = %s",
+        "filter_services_location": SERVICE_COLUMNS + " WHERE s.salon_id = %s AND u.location = %s",
+        "filter_services_type": SERVICE_COLUMNS + " WHERE s.salon_id = %s AND s.service_name = %s",
+        "filter_services_location_type": SERVICE_COLUMNS + """
+            WHERE s.salon_id = %s AND u.location = %s AND s.service_name = %s
+        """,
+        "provider_locations": """
+            SELECT DISTINCT location FROM users WHERE salon_id = %s AND user_type = 'provider'
+        """,
+        "service_types": "SELECT DISTINCT service_name FROM services WHERE salon_id = %s",
+        # Near-me stays within the salon: customers, services and bookings all
+        # belong to one salon, so other salons' providers are not bookable here
+        "provider_coordinates": """
+            SELECT id, location, latitude, longitude FROM users
+            WHERE salon_id = %s AND user_type = 'provider'
+        """,
+        "provider_services": """
+            SELECT id, service_name, description, price, duration
+            FROM services 
+            WHERE provider_id = %s
+        """,
+        "service_booking_info": "SELECT duration, provider_id FROM services WHERE id = %s",
+        "find_conflict": """
+            SELECT id FROM appointments 
+            WHERE provider_id = %s 
+            AND appointment_date = %s 
+            AND status != 'cancelled'
+            AND """ + OVERLAP_CONDITION.format(p="%s") + """
+            LIMIT 1
+        """,
+        "reminder_window": """
+            SELECT id, appointment_date, start_time FROM appointments
+            WHERE salon_id = %s
+            AND appointment_date BETWEEN %s AND %s
+            AND status IN ('pending', 'confirmed')
+        """,
+        "last_event_id": "SELECT COALESCE(MAX(id), 0) FROM appointment_events",
+        "appointment_changes": """
+            SELECT id, entity_id, after_image FROM appointment_events
+            WHERE id > %s
+            AND salon_id = %s
+            AND entity = 'appointment'
+            ORDER BY id
+        """,
+        # Minutes since midnight, so OccupancyIndex.load_day needs no conversion
+        "day_occupancy": """
+            SELECT provider_id, TIME_TO_SEC(start_time) DIV 60, TIME_TO_SEC(end_time) DIV 60
+            FROM appointments
+            WHERE salon_id = %s
+            AND appointment_date = %s
+            AND status != 'cancelled'
+        """,
+        "customer_provider_history": """
+            SELECT provider_id, COUNT(*) FROM appointments
+            WHERE customer_id = %s
+            AND status = 'completed'
+            GROUP BY provider_id
+        """,
+        "provider_store": """
+            SELECT id, provider_id, customer_id, service_id, appointment_date,
+                start_time, end_time, status
+            FROM appointments
+            WHERE provider_id = %s
+            AND appointment_date >= %s
+            ORDER BY id
+        """,
+        "provider_customer_names": """
+            SELECT DISTINCT c.id, c.name
+            FROM appointments a
+            JOIN users c ON a.customer_id = c.id
+            WHERE a.provider_id = %s
+        """,
+        # Locks the provider's day, gaps included, so no booking lands in it
+        # between the conflict check and the commit
+        "lock_provider_day": """
+            SELECT id FROM appointments
+            WHERE provider_id = %s
+            AND appointment_date = %s
+            FOR UPDATE
+        """,
+        "reschedule_conflict": """
+            SELECT id FROM appointments 
+            WHERE provider_id = %s 
+            AND appointment_date = %s 
+            AND status != 'cancelled'
+            AND id != %s
+            AND """ + OVERLAP_CONDITION.format(p="%s") + """
+            LIMIT 1
+        """,
+        "lock_appointment": """
+            SELECT id, salon_id, customer_id, service_id, provider_id, appointment_date,
+                start_time, end_time, status
+            FROM appointments WHERE id = %s FOR UPDATE
+        """,
+        "reschedule_appointment": """
+            UPDATE appointments
+            SET appointment_date = %s, start_time = %s, end_time = %s
+            WHERE id = %s AND provider_id = %s AND status IN ('pending', 'confirmed')
+        """,
+        "upcoming_appointments": """
+            SELECT a.id, a.customer_id, a.service_id, a.provider_id, a.appointment_date,
+                a.start_time, a.end_time, a.status, s.service_name, u.name
+            FROM appointments a
+            JOIN services s ON a.service_id = s.id
+            JOIN users u ON a.provider_id = u.id
+            WHERE a.salon_id = %s
+            AND a.appointment_date >= %s
+            AND a.status != 'cancelled'
+        """,
+        "insert_appointment": """
+            INSERT INTO appointments 
+            (salon_id, customer_id, service_id, provider_id, appointment_date, start_time, end_time, status)
+            VALUES (%s, %s, %s, %s, %s, %s, %s, 'pending')
+        """,
+        "customer_appointments": """
+            SELECT a.id, s.service_name, u.name, a.appointment_date, 
+                a.start_time, a.end_time, a.status
+            FROM appointments a
+            JOIN services s ON a.service_id = s.id
+            JOIN users u ON a.provider_id = u.id
+            WHERE a.customer_id = %s
+            AND a.appointment_date >= %s
+            ORDER BY a.appointment_date, a.start_time
+        """
+    }
+
+    def __init__(self, db):
+        self.db = db
+        self.cursors = {}
+        self.executions = Counter()
+
+    def execute(self, name, params=()):
+        """Run a registered statement, preparing it on first use"""
+        cursor = self.cursors.get(name)
+        if cursor is None:
+            # A prepared cursor re-executes its statement without re-sending the SQL
+            cursor = self.db.cursor(prepared=True)
+            self.cursors[name] = cursor
+        cursor.execute(self.STATEMENTS[name], tuple(params))
+        self.executions[name] += 1
+        return cursor
+
+    def fetchall(self, name, params=()):
+        return self.execute(name, params).fetchall()
+
+    def fetchone(self, name, params=()):
+        rows = self.fetchall(name, params)
+        return rows[0] if rows else None
+
+    def reuse_counts(self):
+        """Executions per statement that reused an already prepared statement"""
+        return {name: self.executions[name] - 1 for name in self.cursors}
+
+    def close(self):
+        for cursor in self.cursors.values():
+            cursor.close()
+        self.cursors.clear()
+
+
+class EventLog:
+    """Append-only record of appointment and service changes with before/after images.
+
+    Events are buffered while a transaction runs and written to
+    appointment_events with one multi-row INSERT just before it commits, so an
+    event exists exactly when its change does and a booking pays one extra
+    round trip. event_log.py rebuilds provider schedules from snapshots plus
+    these events.
+    """
+
+    APPOINTMENT_COLUMNS = ("id", "salon_id", "customer_id", "service_id", "provider_id",
+                           "appointment_date", "start_time", "end_time", "status")
+    SERVICE_COLUMNS = ("id", "salon_id", "provider_id", "service_name", "description", "price", "duration")
+
+    def __init__(self, salon_id):
+        self.salon_id = salon_id
+        self.pending = []
+
+    @staticmethod
+    def image(columns, row):
+        """A row as a JSON-ready dict, dates and times as ISO text"""
+        return {column: LocalReplica.to_text(value) for column, value in zip(columns, row)}
+
+    def record(self, entity, entity_id, provider_id, action, before=None, after=None):
+        self.pending.append((
+            self.salon_id, entity, entity_id, provider_id, action,
+            None if before is None else json.dumps(before, default=str),
+            None if after is None else json.dumps(after, default=str)
+        ))
+
+    def appointment(self, action, before=None, after=None):
+        row = after or before
+        self.record("appointment", row["id"], row["provider_id"], action, before, after)
+
+    def flush(self, cursor):
+        """Write the buffered events; call inside the transaction, right before commit"""
+        if not self.pending:
+            return
+        # Kept until the INSERT succeeds; a failed one leaves them for rollback() to discard
+        cursor.execute(
+            "INSERT INTO appointment_events "
+            "(salon_id, entity, entity_id, provider_id, action, before_image, after_image) VALUES "
+            + ", ".join(["(%s, %s, %s, %s, %s, %s, %s)"] * len(self.pending)),
+            [value for event in self.pending for value in event]
+        )
+        self.pending = []
+
+    def discard(self):
+        self.pending.clear()
+
+
+class ShardMap:
+    """Which database each salon lives in.
+
+    Read from a JSON file (SHARD_MAP, default shards.json) shaped like
+    shards.example.json. Salons missing from the map, or every salon when
+    there is no file, use the "default" shard: the map's "default" entry if
+    it has one, otherwise the DB_HOST/DB_NAME/DB_REPLICA_HOSTS settings from .env.
+    """
+
+    def __init__(self, path=None):
+        self.shards = {}
+        self.salons = {}
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                config = json.load(f)
+            self.shards = config.get("shards", {})
+            self.salons = {int(salon_id): shard for salon_id, shard in config.get("salons", {}).items()}
+
+    @staticmethod
+    def default_shard():
+        return {
+            "host": os.getenv("DB_HOST", "localhost"),
+            "database": os.getenv("DB_NAME", "salon_management"),
+            "replicas": [host.strip() for host in os.getenv("DB_REPLICA_HOSTS", "").split(",") if host.strip()]
+        }
+
+    def shard(self, name):
+        if name not in self.shards:
+            return self.default_shard()
+        shard = dict(self.shards[name])
+        shard.setdefault("database", os.getenv("DB_NAME", "salon_management"))
+        shard.setdefault("replicas", [])
+        return shard
+
+    def shard_for(self, salon_id):
+        """Connection settings for the shard holding salon_id"""
+        return self.shard(self.salons.get(salon_id, "default"))
+
+    def names(self):
+        """Every shard holding salons, for scatter-gather jobs.
+
+        Salons left on the .env database are only reached through a shard
+        named "default" in the map (or when there is no map at all).
+        """
+        return sorted(set(self.shards) | set(self.salons.values())) or ["default"]
+
+
+class ReplicaRouter:
+    """Routes read-only statements to replicas and keeps writes on the primary"""
+
+    STICKY_SECONDS = 5.0        # Reads stay on the primary this long after a write
+    MAX_LAG_SECONDS = 2         # Replicas further behind than this are skipped
+    LAG_CHECK_INTERVAL = 5.0    # Seconds between replication lag checks per replica
+
+    def __init__(self, primary, replica_connections):
+        self.primary = primary
+        self.replicas = []
+        for db in replica_connections:
+            # Replica reads never write; without autocommit the first one would
+            # open a REPEATABLE READ transaction and every later read would see its snapshot
+            db.autocommit = True
+            self.replicas.append({"statements": StatementRegistry(db), "usable": False, "checked_at": None})
+        self.sticky_until = 0.0
+        self.next_replica = 0
+
+    def mark_write(self):
+        """Read-your-writes: pin reads to the primary until replicas have caught up"""
+        self.sticky_until = time.monotonic() + self.STICKY_SECONDS
+
+    def replica_usable(self, replica):
+        """Check replication lag, at most once per LAG_CHECK_INTERVAL"""
+        now = time.monotonic()
+        if replica["checked_at"] is not None and now - replica["checked_at"] < self.LAG_CHECK_INTERVAL:
+            return replica["usable"]
+
+        replica["checked_at"] = now
+        try:
+            cursor = replica["statements"].db.cursor(dictionary=True)
+            cursor.execute("SHOW REPLICA STATUS")
+            status = cursor.fetchone()
+            cursor.close()
+            lag = None
+            if status:
+                lag = status.get("Seconds_Behind_Source", status.get("Seconds_Behind_Master"))
+            replica["usable"] = lag is not None and lag <= self.MAX_LAG_SECONDS
+        except mysql.connector.Error as err:
+            print(f"Replica check failed: {err}")
+            replica["usable"] = False
+        return replica["usable"]
+
+    def reader(self):
+        """Statement registry to use for a read-only query"""
+        if time.monotonic() < self.sticky_until:
+            return self.primary
+
+        for _ in range(len(self.replicas)):
+            replica = self.replicas[self.next_replica]
+            self.next_replica = (self.next_replica + 1) % len(self.replicas)
+            if self.replica_usable(replica):
+                return replica["statements"]
+        return self.primary
+
+    def close(self):
+        for replica in self.replicas:
+            replica["statements"].close()
+            replica["statements"].db.close()
+
+
+class LocalReplica:
+    """SQLite copy of the catalog and upcoming appointments, plus the offline booking queue"""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS services (
+            id INTEGER PRIMARY KEY,
+            service_name TEXT,
+            username TEXT,
+            price REAL,
+            duration INTEGER,
+            location TEXT,
+            description TEXT,
+            provider_id INTEGER
+        );
+        -- Negative ids are placeholders for bookings still waiting in the outbox
+        CREATE TABLE IF NOT EXISTS appointments (
+            id INTEGER PRIMARY KEY,
+            customer_id INTEGER,
+            service_id INTEGER,
+            provider_id INTEGER,
+            appointment_date TEXT,
+            start_time TEXT,
+            end_time TEXT,
+            status TEXT,
+            service_name TEXT,
+            provider_name TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_local_provider_date ON appointments (provider_id, appointment_date);
+        CREATE INDEX IF NOT EXISTS idx_local_customer ON appointments (customer_id);
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY,
+            username TEXT,
+            password TEXT,
+            user_type TEXT,
+            name TEXT
+        );
+        CREATE TABLE IF NOT EXISTS outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            customer_id INTEGER,
+            service_id INTEGER,
+            provider_id INTEGER,
+            appointment_date TEXT,
+            start_time TEXT,
+            end_time TEXT,
+            state TEXT DEFAULT 'queued',
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            error TEXT,
+            notified INTEGER DEFAULT 0
+        );
+    """
+
+    def __init__(self, path):
+        self.conn = sqlite3.connect(path)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=FULL")  # Queued bookings must survive a crash
+        self.conn.executescript(self.SCHEMA)
+
+        # Cache files created before replay outcomes were shown to customers
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(outbox)")}
+        if "notified" not in columns:
+            with self.conn:
+                self.conn.execute("ALTER TABLE outbox ADD COLUMN error TEXT")
+                self.conn.execute("ALTER TABLE outbox ADD COLUMN notified INTEGER DEFAULT 0")
+                self.conn.execute("UPDATE outbox SET notified = 1 WHERE state != 'queued'")
+
+    @staticmethod
+    def to_text(value):
+        """Dates and times are stored as ISO text so they compare correctly in SQLite"""
+        if isinstance(value, timedelta):  # MySQL TIME columns
+            seconds = int(value.total_seconds())
+            return f"{seconds // 3600:02d}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+        if hasattr(value, "isoformat"):
+            return value.isoformat()
+        return value
+
+    def replace_services(self, services):
+        """Replace the catalog with rows shaped like the load_services statement"""
+        with self.conn:
+            self.conn.execute("DELETE FROM services")
+            self.conn.executemany(
+                "INSERT INTO services VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [service[:3] + (float(service[3]),) + service[4:] for service in services]
+            )
+
+    def services(self):
+        return self.conn.execute("""
+            SELECT id, service_name, username, price, duration, location, description, provider_id
+            FROM services
+        """).fetchall()
+
+    def service_booking_info(self, service_id):
+        return self.conn.execute(
+            "SELECT duration, provider_id FROM services WHERE id = ?", (service_id,)
+        ).fetchone()
+
+    def replace_appointments(self, appointments):
+        """Replace synced appointments, keeping placeholders for queued bookings"""
+        with self.conn:
+            self.conn.execute("DELETE FROM appointments WHERE id > 0")
+            self.conn.executemany(
+                "INSERT INTO appointments VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                [tuple(self.to_text(value) for value in appt) for appt in appointments]
+            )
+
+    def store_appointment(self, appointment):
+        """Add one appointment booked online, shaped like upcoming_appointments"""
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO appointments VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                tuple(self.to_text(value) for value in appointment)
+            )
+
+    def find_conflict(self, provider_id, date_obj, start_time, end_time):
+        """Same overlap rule as the server check, against the local copy"""
+        start, end = self.to_text(start_time), self.to_text(end_time)
+        conflict = self.conn.execute(
+            """
+            SELECT id FROM appointments
+            WHERE provider_id = ?
+            AND appointment_date = ?
+            AND status != 'cancelled'
+            AND """ + OVERLAP_CONDITION.format(p="?") + """
+            LIMIT 1
+            """,
+            (provider_id, self.to_text(date_obj), start, start, end, end, start, end)
+        ).fetchone()
+        return conflict[0] if conflict else None
+
+    def customer_appointments(self, customer_id):
+        return self.conn.execute("""
+            SELECT id, service_name, provider_name, appointment_date, start_time, end_time, status
+            FROM appointments
+            WHERE customer_id = ?
+            ORDER BY appointment_date, start_time
+        """, (customer_id,)).fetchall()
+
+    def cache_user(self, user_id, username, password, user_type, name):
+        """Remember a successful login so the user can sign in on this terminal offline"""
+        with self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO users VALUES (?, ?, ?, ?, ?)",
+                (user_id, username, password, user_type, name)
+            )
+
+    def find_user(self, username, password, user_type):
+        return self.conn.execute(
+            "SELECT id, name, user_type FROM users WHERE username = ? AND password = ? AND user_type = ?",
+            (username, password, user_type)
+        ).fetchone()
+
+    def enqueue_booking(self, customer_id, service_id, provider_id, date_obj, start_time, end_time):
+        """Durably queue a booking and show it locally until it is replayed"""
+        booking = (customer_id, service_id, provider_id,
+                   self.to_text(date_obj), self.to_text(start_time), self.to_text(end_time))
+        with self.conn:
+            outbox_id = self.conn.execute(
+                """
+                INSERT INTO outbox
+                (customer_id, service_id, provider_id, appointment_date, start_time, end_time)
+                VALUES (?, ?, ?, ?, ?, ?)
+                """,
+                booking
+            ).lastrowid
+            names = self.conn.execute(
+                "SELECT service_name, username FROM services WHERE id = ?", (service_id,)
+            ).fetchone() or (None, None)
+            self.conn.execute(
+                "INSERT INTO appointments VALUES (?, ?, ?, ?, ?, ?, ?, 'pending', ?, ?)",
+                (-outbox_id,) + booking + tuple(names)
+            )
+        return outbox_id
+
+    def queued_bookings(self, limit):
+        return self.conn.execute("""
+            SELECT id, customer_id, service_id, provider_id, appointment_date, start_time, end_time
+            FROM outbox
+            WHERE state = 'queued'
+            ORDER BY id
+            LIMIT ?
+        """, (limit,)).fetchall()
+
+    def finish_bookings(self, results):
+        """Record replay outcomes of (outbox_id, state, error) and drop the placeholders"""
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE outbox SET state = ?, error = ? WHERE id = ?",
+                [(state, error, outbox_id) for outbox_id, state, error in results]
+            )
+            self.conn.executemany(
+                "DELETE FROM appointments WHERE id = ?",
+                [(-outbox_id,) for outbox_id, _, _ in results]
+            )
+
+    def unnotified_outcomes(self, customer_id):
+        """A customer's queued bookings that were not confirmed and that they have not been told about"""
+        return self.conn.execute("""
+            SELECT o.id, s.service_name, o.appointment_date, o.start_time, o.state, o.error
+            FROM outbox o
+            LEFT JOIN services s ON o.service_id = s.id
+            WHERE o.customer_id = ?
+            AND o.state IN ('conflict', 'failed')
+            AND o.notified = 0
+            ORDER BY o.id
+        """, (customer_id,)).fetchall()
+
+    def mark_notified(self, outbox_ids):
+        with self.conn:
+            self.conn.executemany(
+                "UPDATE outbox SET notified = 1 WHERE id = ?", [(outbox_id,) for outbox_id in outbox_ids]
+            )
+
+    def close(self):
+        self.conn.close()
+
+
+class ReminderScheduler:
+    """Background min-heap of appointment reminders.
+
+    Only reminders due before horizon_end are held, so memory is bounded by
+    the horizon rather than the size of the appointments table; advance()
+    pulls in the next slice and apply() replays changes made inside the
+    horizon. Cancelled and rescheduled reminders are dropped lazily by
+    version number and compacted once they make up half the heap.
+    """
+
+    def __init__(self, offsets_minutes, outbox_path, horizon=timedelta(days=2)):
+        self.offsets = sorted(offsets_minutes)
+        self.outbox_path = outbox_path
+        self.horizon = horizon
+        self.horizon_end = time.time()
+        self.heap = []          # (fire_at, appointment_id, version, offset_minutes)
+        self.versions = {}      # Only appointments changed since the last compaction
+        self.stale = 0
+        self.stopped = False
+        self.condition = threading.Condition()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+
+    @staticmethod
+    def start_datetime(day, start):
+        """Combine an appointment date with a TIME value (timedelta, time or text)"""
+        if isinstance(day, str):
+            day = datetime.strptime(day, "%Y-%m-%d").date()
+        if isinstance(start, timedelta):
+            return datetime.combine(day, datetime.min.time()) + start
+        if isinstance(start, str):
+            start = datetime.strptime(start, "%H:%M:%S").time()
+        return datetime.combine(day, start)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        with self.condition:
+            self.stopped = True
+            self.condition.notify()
+
+    def _entries(self, appointment_id, start_at, version, window_start):
+        """Heap entries for the appointment's reminders that fall in the window"""
+        start_ts = int(start_at.timestamp())
+        return [(start_ts - offset * 60, appointment_id, version, offset)
+                for offset in self.offsets
+                if window_start <= start_ts - offset * 60 < self.horizon_end]
+
+    def _invalidate(self, appointment_id):
+        self.versions[appointment_id] = self.versions.get(appointment_id, 0) + 1
+        self.stale += len(self.offsets)
+        if self.stale > len(self.heap) // 2:
+            # Every surviving entry is current, so versions can start over
+            self.heap = [entry[:2] + (0,) + entry[3:] for entry in self.heap
+                         if entry[2] == self.versions.get(entry[1], 0)]
+            heapq.heapify(self.heap)
+            self.versions.clear()
+            self.stale = 0
+
+    def advance(self, appointments, horizon_end):
+        """Move the horizon forward, adding reminders that fall in the new window.
+
+        appointments are (id, date, start_time) rows covering the window.
+        """
+        with self.condition:
+            window_start = max(self.horizon_end, time.time())
+            self.horizon_end = horizon_end.timestamp()
+            entries = []
+            for appointment_id, day, start in appointments:
+                entries += self._entries(appointment_id, self.start_datetime(day, start),
+                                         self.versions.get(appointment_id, 0), window_start)
+            self.heap += entries
+            heapq.heapify(self.heap)
+            self.condition.notify()
+
+    def window_dates(self, horizon_end):
+        """Appointment dates whose reminders can fall between the current and new horizon"""
+        first = datetime.fromtimestamp(max(self.horizon_end, time.time()))
+        return first.date(), (horizon_end + timedelta(minutes=self.offsets[-1])).date()
+
+    def schedule(self, appointment_id, start_at):
+        """Add or replace the reminders of a booked or rescheduled appointment"""
+        with self.condition:
+            self._invalidate(appointment_id)
+            for entry in self._entries(appointment_id, start_at, self.versions.get(appointment_id, 0), time.time()):
+                heapq.heappush(self.heap, entry)
+            self.condition.notify()
+
+    def cancel(self, appointment_id):
+        with self.condition:
+            self._invalidate(appointment_id)
+
+    def apply(self, changes):
+        """Replace the reminders of changed appointments.
+
+        changes are (id, date, start_time, status) rows; status is None for a
+        deleted appointment. Only pending and confirmed appointments keep reminders.
+        """
+        now = time.time()
+        with self.condition:
+            for appointment_id, day, start, status in changes:
+                self._invalidate(appointment_id)
+                if status in ("pending", "confirmed"):
+                    for entry in self._entries(appointment_id, self.start_datetime(day, start),
+                                               self.versions.get(appointment_id, 0), now):
+                        heapq.heappush(self.heap, entry)
+            self.condition.notify()
+
+    def run(self):
+        while True:
+            due = []
+            with self.condition:
+                while not self.stopped:
+                    if self.heap and self.heap[0][0] <= time.time():
+                        break
+                    timeout = self.heap[0][0] - time.time() if self.heap else None
+                    self.condition.wait(timeout)
+                if self.stopped:
+                    return
+
+                while self.heap and self.heap[0][0] <= time.time():
+                    fire_at, appointment_id, version, offset = heapq.heappop(self.heap)
+                    if version != self.versions.get(appointment_id, 0):
+                        self.stale -= 1
+                        continue
+                    due.append((fire_at, appointment_id, offset))
+
+            self.notify(due)
+
+    def notify(self, due):
+        """Stub notifier: append due reminders to the outbox file for delivery"""
+        with open(self.outbox_path, "a", encoding="utf-8") as outbox:
+            for fire_at, appointment_id, offset in due:
+                outbox.write(json.dumps({
+                    "appointment_id": appointment_id,
+                    "appointment_at": datetime.fromtimestamp(fire_at + offset * 60).isoformat(),
+                    "minutes_before": offset,
+                    "sent_at": datetime.now().isoformat(timespec="seconds")
+                }) + "\n")
+
+
+class OccupancyIndex:
+    """Booked intervals per provider and day, for scoring automatic provider assignment.
+
+    Lower scores win: a provider is preferred when their day is less full,
+    when the booking does not leave an unusably short gap next to another
+    appointment, and when the customer has been to them before. The day is
+    reloaded from the primary for every decision, so bookings, cancellations
+    and reschedules from any terminal are taken into account.
+    """
+
+    DAY_MINUTES = 10 * 60       # Nominal working day used for utilisation
+    MIN_USEFUL_GAP = 30         # Gaps shorter than this are wasted capacity
+    UTILISATION_WEIGHT = 1.0
+    GAP_WEIGHT = 0.5
+    HISTORY_WEIGHT = 0.3
+    HISTORY_CAP = 5             # Visits after which loyalty stops adding weight
+
+    def __init__(self):
+        self.intervals = defaultdict(list)  # (provider_id, day) -> sorted [(start, end)] in minutes
+        self.booked = Counter()             # (provider_id, day) -> booked minutes
+
+    @staticmethod
+    def minutes(value):
+        """Minutes since midnight of a TIME value (timedelta, time or HH:MM:SS text)"""
+        if isinstance(value, timedelta):
+            return int(value.total_seconds()) // 60
+        if isinstance(value, str):
+            value = datetime.strptime(value, "%H:%M:%S").time()
+        return value.hour * 60 + value.minute
+
+    def load_day(self, day, appointments):
+        """Replace the index with one day's (provider_id, start, end) rows, times in minutes"""
+        self.intervals.clear()
+        self.booked.clear()
+        for provider_id, start, end in appointments:
+            self.intervals[(provider_id, day)].append((start, end))
+        for key, intervals in self.intervals.items():
+            intervals.sort()
+            self.booked[key] = sum(end - start for start, end in intervals)
+
+    def score(self, provider_id, day, start, end, visits=0):
+        """Score a booking of [start, end) minutes, or None if the provider is busy"""
+        intervals = self.intervals.get((provider_id, day), [])
+        i = bisect_left(intervals, (start, end))
+        prev_end = intervals[i - 1][1] if i > 0 else None
+        next_start = intervals[i][0] if i < len(intervals) else None
+        if (prev_end is not None and prev_end > start) or (next_start is not None and next_start < end):
+            return None
+
+        gaps = (start - prev_end if prev_end is not None else None,
+                next_start - end if next_start is not None else None)
+        wasted_gaps = sum(1 for gap in gaps if gap is not None and 0 < gap < self.MIN_USEFUL_GAP)
+        return (self.UTILISATION_WEIGHT * self.booked[(provider_id, day)] / self.DAY_MINUTES
+                + self.GAP_WEIGHT * wasted_gaps
+                - self.HISTORY_WEIGHT * min(visits, self.HISTORY_CAP) / self.HISTORY_CAP)
+
+    def rank(self, candidates, day, start_clock, history):
+        """Free candidates as (score, service_id, provider_id, duration), best first.
+
+        candidates are (service_id, provider_id, duration) and history maps
+        provider_id to the customer's completed visits.
+        """
+        start = start_clock.hour * 60 + start_clock.minute
+        ranked = []
+        for service_id, provider_id, duration in candidates:
+            score = self.score(provider_id, day, start, start + duration, history.get(provider_id, 0))
+            if score is not None:
+                ranked.append((score, service_id, provider_id, duration))
+        ranked.sort()
+        return ranked
+
+
+class AppointmentStore:
+    """Columnar in-memory appointments for the provider dashboard and analytics.
+
+    Each appointment takes 25 bytes across NumPy columns (dates as day
+    ordinals, times as minutes since midnight, status as a code) instead of a
+    tuple of date/timedelta/str objects. Rows stay sorted by id, so lookups
+    by id are a binary search rather than a dict entry per appointment.
+    """
+
+    COLUMNS = {
+        "id": np.int32,
+        "provider_id": np.int32,
+        "customer_id": np.int32,
+        "service_id": np.int32,
+        "day": np.int32,
+        "start": np.int16,
+        "end": np.int16,
+        "status": np.int8
+    }
+    GROWTH = 1.5
+
+    def __init__(self, capacity=1024):
+        self.size = 0
+        self.columns = {name: np.zeros(capacity, dtype) for name, dtype in self.COLUMNS.items()}
+
+    def __len__(self):
+        return self.size
+
+    def __getitem__(self, name):
+        """The live part of a column"""
+        return self.columns[name][:self.size]
+
+    @property
+    def nbytes(self):
+        return sum(column.nbytes for column in self.columns.values())
+
+    @staticmethod
+    def encode(appointment):
+        """(id, provider_id, customer_id, service_id, date, start, end, status) as column values"""
+        appointment_id, provider_id, customer_id, service_id, day, start, end, status = appointment
+        if isinstance(day, str):
+            day = datetime.strptime(day, "%Y-%m-%d").date()
+        return (appointment_id, provider_id, customer_id, service_id, day.toordinal(),
+                OccupancyIndex.minutes(start), OccupancyIndex.minutes(end), STATUS_CODES[status])
+
+    def load(self, appointments):
+        """Replace the contents with rows ordered by id"""
+        encoded = [self.encode(appointment) for appointment in appointments]
+        self.size = len(encoded)
+        capacity = max(1024, int(self.size * self.GROWTH))
+        for i, (name, dtype) in enumerate(self.COLUMNS.items()):
+            column = np.zeros(capacity, dtype)
+            column[:self.size] = [row[i] for row in encoded]
+            self.columns[name] = column
+
+    def append(self, appointment):
+        """Add a newly booked appointment; new ids are larger, so order is kept"""
+        if self.size == len(self.columns["id"]):
+            capacity = int(self.size * self.GROWTH) + 1
+            for name, column in self.columns.items():
+                grown = np.zeros(capacity, column.dtype)
+                grown[:self.size] = column[:self.size]
+                self.columns[name] = grown
+        for name, value in zip(self.COLUMNS, self.encode(appointment)):
+            self.columns[name][self.size] = value
+        self.size += 1
+
+    def rows_for(self, appointment_ids):
+        """Row positions of the given ids that are in the store"""
+        ids = self["id"]
+        wanted = np.asarray(appointment_ids, dtype=np.int32)
+        positions = np.searchsorted(ids, wanted)
+        positions = positions[positions < self.size]
+        return positions[np.isin(ids[positions], wanted)]
+
+    def set_status(self, appointment_ids, status):
+        self.columns["status"][self.rows_for(appointment_ids)] = STATUS_CODES[status]
+
+    def reschedule(self, appointment_id, day, start, end):
+        rows = self.rows_for([appointment_id])
+        self.columns["day"][rows] = day.toordinal()
+        self.columns["start"][rows] = start
+        self.columns["end"][rows] = end
+
+    def provider_rows(self, provider_id, first_day=None, last_day=None):
+        """Row positions for a provider, optionally within a date range, by date and time"""
+        mask = self["provider_id"] == provider_id
+        if first_day is not None:
+            mask &= self["day"] >= first_day.toordinal()
+        if last_day is not None:
+            mask &= self["day"] <= last_day.toordinal()
+        rows = np.flatnonzero(mask)
+        return rows[np.lexsort((self["start"][rows], self["day"][rows]))]
+
+    def has_conflict(self, provider_id, day, start, end, exclude_id=None):
+        """Vectorised version of OVERLAP_CONDITION against active appointments"""
+        starts, ends = self["start"], self["end"]
+        mask = ((self["provider_id"] == provider_id)
+                & (self["day"] == day.toordinal())
+                & (self["status"] != STATUS_CODES["cancelled"])
+                & (((starts <= start) & (ends > start))
+                   | ((starts < end) & (ends >= end))
+                   | ((starts >= start) & (ends <= end))))
+        if exclude_id is not None:
+            mask &= self["id"] != exclude_id
+        return bool(mask.any())
+
+    def record(self, row):
+        """One row as (id, customer_id, service_id, date, start, end, status) Python values"""
+        start, end = int(self["start"][row]), int(self["end"][row])
+        return (int(self["id"][row]), int(self["customer_id"][row]), int(self["service_id"][row]),
+                date.fromordinal(int(self["day"][row])),
+                f"{start // 60:02d}:{start % 60:02d}:00", f"{end // 60:02d}:{end % 60:02d}:00",
+                STATUS_NAMES[self["status"][row]])
+
+    def status_counts(self, provider_id):
+        rows = self["provider_id"] == provider_id
+        counts = np.bincount(self["status"][rows], minlength=len(STATUS_NAMES))
+        return dict(zip(STATUS_NAMES, counts.tolist()))
+
+    def weekday_counts(self, provider_id):
+        """Active appointments per weekday, Monday first"""
+        rows = (self["provider_id"] == provider_id) & (self["status"] != STATUS_CODES["cancelled"])
+        # Ordinal 1 (0001-01-01) was a Monday
+        return np.bincount((self["day"][rows] - 1) % 7, minlength=7).tolist()
+
+
+class ProviderCalendar:
+    """Month calendar for a provider drawn on a single Canvas.
+
+    Days run left to right and hours top to bottom; the hours cover the
+    bookable day, stretched to fit any older appointment outside it.
+    Appointment blocks come from the AppointmentStore; only days inside the
+    viewport are drawn, and their blocks reuse a pool of canvas items that is
+    reconfigured rather than recreated. Pending and confirmed blocks can be
+    dragged to reschedule them.
+    """
+
+    DAY_WIDTH = 140
+    HOUR_HEIGHT = 48
+    HEADER_HEIGHT = 30
+    DAY_START = BOOKABLE_START
+    DAY_END = BOOKABLE_END
+    SNAP_MINUTES = 15
+    STATUS_COLORS = {
+        "pending": "#ffd1dc",
+        "confirmed": "#ff6b81",
+        "completed": "#cccccc"
+    }
+
+    def __init__(self, parent, store, provider_id, describe, on_reschedule):
+        self.store = store
+        self.provider_id = provider_id
+        self.describe = describe            # (customer_id, service_id) -> block label
+        self.on_reschedule = on_reschedule  # (appointment_id, day, start, end) -> bool
+        self.first_day = datetime.now().date().replace(day=1)
+        self.days = 0
+        self.rows = np.array([], dtype=np.int64)
+        self.row_days = np.array([], dtype=np.int32)
+        self.pool = []                      # [(rect, text)] reused between renders
+        self.item_appointment = {}          # canvas item -> appointment id
+        self.appointment_item = {}          # appointment id -> pool index
+        self.visible = None
+        self.render_job = None
+        self.drag = None
+        self.hours = None                   # (first, last) minute covered by the grid
+
+        nav = ttk.Frame(parent)
+        nav.pack(fill=tk.X, pady=5)
+        ttk.Button(nav, text="< Prev", command=lambda: self.shift_month(-1)).pack(side=tk.LEFT, padx=5)
+        self.month_label = ttk.Label(nav, font=('Arial', 12, 'bold'))
+        self.month_label.pack(side=tk.LEFT, padx=10)
+        ttk.Button(nav, text="Next >", command=lambda: self.shift_month(1)).pack(side=tk.LEFT, padx=5)
+
+        frame = ttk.Frame(parent)
+        frame.pack(fill=tk.BOTH, expand=True)
+        self.canvas = tk.Canvas(frame, bg="white", highlightthickness=0)
+        xscroll = ttk.Scrollbar(frame, orient="horizontal", command=self.canvas.xview)
+        yscroll = ttk.Scrollbar(frame, orient="vertical", command=self.canvas.yview)
+        self.canvas.configure(
+            xscrollcommand=lambda *args: (xscroll.set(*args), self.schedule_render()),
+            yscrollcommand=yscroll.set
+        )
+        xscroll.pack(side=tk.BOTTOM, fill=tk.X)
+        yscroll.pack(side=tk.RIGHT, fill=tk.Y)
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.canvas.bind("<Configure>", lambda event: self.schedule_render())
+        self.canvas.tag_bind("appointment", "<ButtonPress-1>", self.start_drag)
+        self.canvas.tag_bind("appointment", "<B1-Motion>", self.continue_drag)
+        self.canvas.tag_bind("appointment", "<ButtonRelease-1>", self.finish_drag)
+
+        self.show_month()
+
+    def shift_month(self, step):
+        month = self.first_day.month - 1 + step
+        self.first_day = self.first_day.replace(year=self.first_day.year + month // 12, month=month % 12 + 1)
+        self.show_month()
+
+    def show_month(self):
+        """Load the month's appointments and draw its grid"""
+        next_month = (self.first_day.replace(day=28) + timedelta(days=4)).replace(day=1)
+        self.days = (next_month - self.first_day).days
+        self.month_label.configure(text=self.first_day.strftime("%B %Y"))
+        self.hours = None
+        self.canvas.xview_moveto(0)
+        self.refresh()
+
+    def draw_grid(self):
+        """Draw the static day columns and hour lines for self.hours"""
+        self.canvas.delete("grid")
+        width = self.days * self.DAY_WIDTH
+        height = self.y_for(self.hours[1])
+        self.canvas.configure(scrollregion=(0, 0, width, height))
+
+        for hour in range(self.hours[0] // 60, self.hours[1] // 60 + 1):
+            y = self.y_for(hour * 60)
+            self.canvas.create_line(0, y, width, y, fill="#eeeeee", tags="grid")
+        for index in range(self.days):
+            x = index * self.DAY_WIDTH
+            day = self.first_day + timedelta(days=index)
+            self.canvas.create_line(x, 0, x, height, fill="#dddddd", tags="grid")
+            self.canvas.create_text(x + self.DAY_WIDTH / 2, self.HEADER_HEIGHT / 2,
+                                    text=day.strftime("%a %d"), tags="grid")
+        self.canvas.tag_lower("grid")
+
+    def y_for(self, minutes):
+        return self.HEADER_HEIGHT + (minutes - self.hours[0]) * self.HOUR_HEIGHT / 60
+
+    def refresh(self):
+        """Re-read the month from the store after bookings or reschedules"""
+        last_day = self.first_day + timedelta(days=self.days - 1)
+        rows = self.store.provider_rows(self.provider_id, self.first_day, last_day)
+        active = self.store["status"][rows] != STATUS_CODES["cancelled"]
+        self.rows = rows[active]
+        self.row_days = self.store["day"][self.rows] - self.first_day.toordinal()
+
+        # Whole hours covering the bookable day and every appointment shown
+        hours = (self.DAY_START, self.DAY_END)
+        if len(self.rows):
+            hours = (min(hours[0], int(self.store["start"][self.rows].min()) // 60 * 60),
+                     max(hours[1], -(-int(self.store["end"][self.rows].max()) // 60) * 60))
+        if hours != self.hours:
+            self.hours = hours
+            self.draw_grid()
+
+        self.visible = None
+        self.schedule_render()
+
+    def schedule_render(self):
+        """Coalesce scroll and resize events into one render per idle cycle"""
+        if self.render_job is None:
+            self.render_job = self.canvas.after_idle(self.render)
+
+    def render(self):
+        """Place pooled items for appointments on the visible days only"""
+        self.render_job = None
+        if self.drag:
+            return
+
+        left = self.canvas.canvasx(0)
+        right = self.canvas.canvasx(self.canvas.winfo_width())
+        visible = (max(0, int(left // self.DAY_WIDTH)), min(self.days - 1, int(right // self.DAY_WIDTH)))
+        if visible == self.visible:
+            return
+        self.visible = visible
+
+        # row_days is sorted, so the visible slice is two binary searches
+        lo = np.searchsorted(self.row_days, visible[0], side="left")
+        hi = np.searchsorted(self.row_days, visible[1], side="right")
+
+        self.item_appointment.clear()
+        self.appointment_item.clear()
+        for index, row in enumerate(self.rows[lo:hi]):
+            if index == len(self.pool):
+                rect = self.canvas.create_rectangle(0, 0, 0, 0, outline="white", tags="appointment")
+                text = self.canvas.create_text(0, 0, anchor="nw", font=('Arial', 8),
+                                               width=self.DAY_WIDTH - 8, tags="appointment")
+                self.pool.append((rect, text))
+            self.place(index, self.store.record(row))
+
+        for rect, text in self.pool[hi - lo:]:
+            self.canvas.itemconfigure(rect, state="hidden")
+            self.canvas.itemconfigure(text, state="hidden")
+
+    def place(self, index, record):
+        """Move pooled item pair `index` onto an appointment record"""
+        appointment_id, customer_id, service_id, day, start, end, status = record
+        start, end = OccupancyIndex.minutes(start), OccupancyIndex.minutes(end)
+        x = (day - self.first_day).days * self.DAY_WIDTH
+        rect, text = self.pool[index]
+
+        self.canvas.coords(rect, x + 2, self.y_for(start), x + self.DAY_WIDTH - 2, self.y_for(end))
+        self.canvas.itemconfigure(rect, fill=self.STATUS_COLORS.get(status, "#cccccc"), state="normal")
+        self.canvas.coords(text, x + 5, self.y_for(start) + 2)
+        self.canvas.itemconfigure(text, text=self.describe(customer_id, service_id), state="normal")
+
+        self.item_appointment[rect] = self.item_appointment[text] = appointment_id
+        self.appointment_item[appointment_id] = index
+
+    def update_appointment(self, appointment_id):
+        """Redraw one block in place after its time or status changed"""
+        index = self.appointment_item.get(appointment_id)
+        rows = self.store.rows_for([appointment_id])
+        if index is not None and len(rows):
+            self.place(index, self.store.record(rows[0]))
+
+    def update_statuses(self, appointment_ids):
+        """Recolour blocks after a status change and take cancelled ones off the grid"""
+        rows = self.store.rows_for(appointment_ids)
+        cancelled = rows[self.store["status"][rows] == STATUS_CODES["cancelled"]]
+        if len(cancelled):
+            keep = ~np.isin(self.rows, cancelled)
+            self.rows, self.row_days = self.rows[keep], self.row_days[keep]
+            # The freed pool items stay hidden until the next render reassigns them
+            for appointment_id in self.store["id"][cancelled].tolist():
+                index = self.appointment_item.pop(appointment_id, None)
+                if index is not None:
+                    for item in self.pool[index]:
+                        self.canvas.itemconfigure(item, state="hidden")
+                        self.item_appointment.pop(item, None)
+        for appointment_id in appointment_ids:
+            self.update_appointment(appointment_id)
+
+    def start_drag(self, event):
+        item = self.canvas.find_withtag("current")
+        appointment_id = self.item_appointment.get(item[0]) if item else None
+        if appointment_id is None:
+            return
+        record = self.store.record(self.store.rows_for([appointment_id])[0])
+        if record[6] not in ("pending", "confirmed"):
+            return
+        self.drag = {
+            "appointment_id": appointment_id,
+            "record": record,
+            "items": self.pool[self.appointment_item[appointment_id]],
+            "x": self.canvas.canvasx(event.x),
+            "y": self.canvas.canvasy(event.y)
+        }
+        for item in self.drag["items"]:
+            self.canvas.tag_raise(item)
+
+    def continue_drag(self, event):
+        if not self.drag:
+            return
+        x, y = self.canvas.canvasx(event.x), self.canvas.canvasy(event.y)
+        for item in self.drag["items"]:
+            self.canvas.move(item, x - self.drag["x"], y - self.drag["y"])
+        self.drag["x"], self.drag["y"] = x, y
+
+    def finish_drag(self, event):
+        """Snap the dropped block to the grid and ask the app to reschedule it"""
+        if not self.drag:
+            return
+        drag, self.drag = self.drag, None
+        appointment_id, record = drag["appointment_id"], drag["record"]
+        x1, y1, x2, y2 = self.canvas.coords(drag["items"][0])
+
+        duration = OccupancyIndex.minutes(record[5]) - OccupancyIndex.minutes(record[4])
+        day_index = int((x1 + x2) / 2 // self.DAY_WIDTH)
+        raw_start = self.hours[0] + (y1 - self.HEADER_HEIGHT) * 60 / self.HOUR_HEIGHT
+        start = int(round(raw_start / self.SNAP_MINUTES) * self.SNAP_MINUTES)
+        end = start + duration
+        day = self.first_day + timedelta(days=day_index)
+
+        # Availability rules: inside the month and bookable hours, not in the past, no overlap
+        valid = (0 <= day_index < self.days
+                 and self.DAY_START <= start and end <= self.DAY_END
+                 and datetime.combine(day, datetime.min.time()) + timedelta(minutes=start) > datetime.now()
+                 and not self.store.has_conflict(self.provider_id, day, start, end, exclude_id=appointment_id))
+
+        if valid and (day, start) != (record[3], OccupancyIndex.minutes(record[4])):
+            valid = self.on_reschedule(appointment_id, day, start, end)
+
+        if valid:
+            self.refresh()  # Day order may have changed
+        else:
+            self.update_appointment(appointment_id)  # Snap back
+
+
+class ServiceSearchIndex:
+    """In-memory inverted index over the service catalog with trigram fuzzy matching.
+
+    Services are numbered by position; each posting list is a pair of NumPy
+    arrays (positions, weights), so a query scores the whole catalog with a
+    few vectorised scatter-adds instead of a Python loop per matching service.
+    """
+
+    # Relative weight of a hit in each indexed field
+    FIELD_WEIGHTS = {
+        "service_name": 3.0,
+        "provider": 2.0,
+        "location": 2.0,
+        "description": 1.0
+    }
+    FUZZY_THRESHOLD = 0.6   # Share of query trigrams a service name must contain
+    MAX_PREFIX_EXPANSION = 50
+    PAGE_SIZE = 100
+    FILTER_COLUMNS = (1, 5)  # service_name and location, the dashboard's dropdowns
+    TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+    def __init__(self):
+        self.rows = {}
+        self.row_list = []
+        self.postings = {}
+        self.vocabulary = []
+        # Fuzzy matching works on distinct names, which repeat a lot across providers
+        self.names = []
+        self.name_positions = []
+        self.trigrams = {}
+        # {column: {value: positions}} for exact-match filters
+        self.value_positions = {}
+        self.row_name_ids = np.zeros(0, dtype=np.int64)
+
+    @staticmethod
+    def tokenize(text):
+        """Split text into lowercase alphanumeric tokens"""
+        return ServiceSearchIndex.TOKEN_PATTERN.findall((text or "").lower())
+
+    @staticmethod
+    def make_trigrams(text):
+        """Trigrams of the text with spaces and punctuation removed"""
+        compact = "".join(ServiceSearchIndex.tokenize(text))
+        return {compact[i:i + 3] for i in range(len(compact) - 2)}
+
+    def build(self, services):
+        """Index rows of (id, service_name, provider, price, duration, location, description)"""
+        self.__init__()
+        self.row_list = list(services)
+        self.rows = {service[0]: service for service in self.row_list}
+        count = len(self.row_list)
+        if not count:
+            return
+
+        # Names, locations and descriptions repeat across the catalog, so the
+        # Python work is one dict lookup per row and field; each distinct text
+        # is tokenized once into an "entry" and NumPy expands entries per row
+        token_ids = {}
+        entry_tokens, entry_weights = [], []
+        row_entries = []
+        for column, field in ((1, "service_name"), (2, "provider"), (5, "location"), (6, "description")):
+            weight = self.FIELD_WEIGHTS[field]
+            entries = {}
+            for service in self.row_list:
+                text = service[column]
+                if text not in entries:
+                    entries[text] = len(entry_tokens)
+                    counts = {}
+                    for token in self.tokenize(text):
+                        counts[token] = counts.get(token, 0) + 1
+                    entry_tokens.append([token_ids.setdefault(token, len(token_ids)) for token in counts])
+                    entry_weights.append([weight * n for n in counts.values()])
+            row_entries.append([entries[service[column]] for service in self.row_list])
+
+        lengths = np.array([len(tokens) for tokens in entry_tokens], dtype=np.int64)
+        offsets = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        flat_tokens = np.fromiter((t for tokens in entry_tokens for t in tokens), dtype=np.int64, count=lengths.sum())
+        flat_weights = np.fromiter((w for ws in entry_weights for w in ws), dtype=np.float64, count=lengths.sum())
+
+        entry_of = np.concatenate([np.array(ids, dtype=np.int64) for ids in row_entries])
+        row_of = np.tile(np.arange(count, dtype=np.int64), len(row_entries))
+        spans = lengths[entry_of]
+        starts = np.repeat(offsets[entry_of] - (np.cumsum(spans) - spans), spans)
+        flat = starts + np.arange(spans.sum())
+
+        # Merge repeated (token, row) pairs, then cut one slice per token
+        keys, inverse = np.unique(flat_tokens[flat] * count + np.repeat(row_of, spans), return_inverse=True)
+        merged = np.bincount(inverse, weights=flat_weights[flat]).astype(np.float32)
+        token_of, position_of = np.divmod(keys, count)
+        bounds = np.searchsorted(token_of, np.arange(len(token_ids) + 1))
+        self.postings = {
+            token: (position_of[bounds[i]:bounds[i + 1]].astype(np.int32), merged[bounds[i]:bounds[i + 1]])
+            for token, i in token_ids.items()
+        }
+        self.vocabulary = sorted(self.postings)
+
+        # Distinct service and provider names for fuzzy matching
+        name_index = {}
+        row_names = []
+        for column in (1, 2):
+            for service in self.row_list:
+                row_names.append(name_index.setdefault(service[column], len(name_index)))
+        self.names = list(name_index)
+        for index, name in enumerate(self.names):
+            for gram in self.make_trigrams(name):
+                self.trigrams.setdefault(gram, []).append(index)
+        self.trigrams = {gram: np.array(indexes, dtype=np.int32) for gram, indexes in self.trigrams.items()}
+
+        row_names = np.array(row_names, dtype=np.int64)
+        self.row_name_ids = row_names[:count]
+        name_rows = np.tile(np.arange(count, dtype=np.int32), 2)
+        order = np.argsort(row_names, kind="stable")
+        bounds = np.searchsorted(row_names[order], np.arange(len(self.names) + 1))
+        self.name_positions = [np.unique(name_rows[order[bounds[i]:bounds[i + 1]]])
+                               for i in range(len(self.names))]
+
+        for column in self.FILTER_COLUMNS:
+            groups = {}
+            for position, service in enumerate(self.row_list):
+                groups.setdefault(service[column], []).append(position)
+            self.value_positions[column] = {value: np.array(positions, dtype=np.int32)
+                                            for value, positions in groups.items()}
+
+    def expand_prefix(self, term):
+        """Indexed tokens starting with term, for search-as-you-type"""
+        matches = []
+        i = bisect_left(self.vocabulary, term)
+        while (i < len(self.vocabulary) and self.vocabulary[i].startswith(term)
+               and len(matches) < self.MAX_PREFIX_EXPANSION):
+            matches.append(self.vocabulary[i])
+            i += 1
+        return matches
+
+    def allowed(self, filters):
+        """Boolean mask of the rows whose columns equal every {column: value} in filters"""
+        keep = np.ones(len(self.row_list), dtype=bool)
+        for column, value in filters.items():
+            only = np.zeros(len(self.row_list), dtype=bool)
+            positions = self.value_positions[column].get(value)
+            if positions is not None:
+                only[positions] = True
+            keep &= only
+        return keep
+
+    def search(self, text, limit=PAGE_SIZE, filters=None):
+        """Return indexed rows ranked by relevance to text.
+
+        filters ({column: value} over FILTER_COLUMNS) narrow the rows before
+        ranking, so the page holds the best matches that pass them; limit=None
+        returns every match.
+        """
+        terms = self.tokenize(text)
+        if not terms or not self.row_list:
+            return []
+
+        keep = self.allowed(filters) if filters else None
+        scores = np.zeros(len(self.row_list), dtype=np.float32)
+
+        # Exact token hits; the last term is treated as a prefix while typing
+        for i, term in enumerate(terms):
+            tokens = self.expand_prefix(term) if i == len(terms) - 1 else [term]
+            for token in tokens:
+                positions, weights = self.postings.get(token, (None, None))
+                if positions is not None:
+                    boost = 1.0 if token == term else 0.5
+                    scores[positions] += weights * boost
+
+        # Fuzzy name matching ("haircut" finds "Hair Cut & Style") ranks
+        # alongside the token hits rather than only topping up a short page.
+        # It is another way of matching the name, so it is not added on top
+        grams = self.make_trigrams(text)
+        if grams:
+            found = [self.trigrams[gram] for gram in grams if gram in self.trigrams]
+            if found:
+                similarity = np.bincount(np.concatenate(found), minlength=len(self.names)) / len(grams)
+                for index in np.flatnonzero(similarity >= self.FUZZY_THRESHOLD):
+                    positions = self.name_positions[index]
+                    scores[positions] = np.maximum(
+                        scores[positions], similarity[index] * self.FIELD_WEIGHTS["service_name"]
+                    )
+
+        if keep is not None:
+            scores[~keep] = 0
+        hits = np.flatnonzero(scores)
+        if limit is not None and len(hits) > limit:
+            # Everything scoring at least the limit-th best, ties included
+            cutoff = np.partition(scores[hits], len(hits) - limit)[len(hits) - limit]
+            hits = hits[scores[hits] >= cutoff]
+
+        # Equal scores alternate between service names, so one name offered by
+        # hundreds of providers cannot fill the page on its own
+        names = self.row_name_ids[hits]
+        order = np.argsort(names, kind="stable")
+        grouped = names[order]
+        starts = np.flatnonzero(np.concatenate(([True], grouped[1:] != grouped[:-1])))
+        occurrence = np.empty(len(hits), dtype=np.int64)
+        occurrence[order] = np.arange(len(hits)) - np.repeat(starts, np.diff(np.append(starts, len(hits))))
+        hits = hits[np.lexsort((occurrence, -scores[hits]))][:limit]
+        return [self.row_list[position] for position in hits]
+
+
 class SalonApp:
     def __init__(self, root):
         self.root = root
@@ -36,38 +1593,333 @@ class SalonApp:
         # MySQL Database connection
         load_dotenv()  # Loads secrets from .env file
 
-        self.db = mysql.connector.connect(
-            host=os.getenv("DB_HOST", "localhost"),  # Default: localhost
-            user=os.getenv("DB_USER", "salon_user"),  # Default: salon_user
-            password=os.getenv("DB_PASSWORD"),  # No default! Must be in .env
-            database=os.getenv("DB_NAME", "salon_management")
-        )
-        self.cursor = self.db.cursor()
+        # Local replica and offline booking queue for this terminal
+        self.local = LocalReplica(os.getenv("LOCAL_CACHE_PATH", "salon_cache.db"))
+        self.offline = False
+        self.reconnect_job = None
+        self.db = None
+        self.reminders = None
+
+        # The salon (branch) this terminal serves, and where its data lives
+        self.salon_id = int(os.getenv("SALON_ID", "1"))
+        self.shard_map = ShardMap(os.getenv("SHARD_MAP", "shards.json"))
+        self.events = EventLog(self.salon_id)
 
-        # Verify database is properly set up
         try:
-            self.cursor.execute("SELECT 1 FROM users LIMIT 1")
-        except mysql.connector.Error:
-            messagebox.showerror(
-                "Database Error", 
-                "Database not initialized!\n\n"
-                "Run:\n'mysql -u root -p < schema.sql'\n"
-                "to set up the database."
-            )
-            self.root.destroy()
-            return
-        
-        # Create tables if they don't exist
-        self.create_tables()
+            self.connect_primary()
+        except mysql.connector.Error as err:
+            print(f"Database unreachable, starting offline: {err}")
+            self.go_offline()
+
+        if not self.offline:
+            # Verify database is properly set up
+            try:
+                self.cursor.execute("SELECT 1 FROM users LIMIT 1")
+            except mysql.connector.Error:
+                messagebox.showerror(
+                    "Database Error", 
+                    "Database not initialized!\n\n"
+                    "Run:\n'mysql -u root -p < schema.sql'\n"
+                    "to set up the database."
+                )
+                self.root.destroy()
+                return
+            
+            # Create tables if they don't exist
+            self.create_tables()
+
+            # Replay bookings queued during an earlier offline session
+            self.sync_outbox()
         
         # Current user info
         self.current_user = None
         self.user_type = None
+
+        # Catalog rows by id, and its search index, rebuilt off the Tk thread
+        # whenever the catalog changes
+        self.catalog = {}
+        self.search_index = ServiceSearchIndex()
+        self.search_job = None
+        self.index_generation = 0
+        self.built_index = None
+        self.index_job = None
+        self.provider_locator = ProviderLocator()
+
+        # Booked intervals per provider and day for "any provider" bookings
+        self.occupancy = OccupancyIndex()
+
+        # Provider dashboard appointments, loaded once per dashboard and kept in sync
+        self.appointment_store = AppointmentStore()
+        self.customer_names = {}
+        self.service_names = {}
+        self.calendar_view = None
+
+        # Appointment reminders, when REMINDER_OFFSETS_MINUTES is set for this terminal
+        self.reminder_event_id = None
+        self.reminder_events_seen = set()
+        offsets = [int(m) for m in os.getenv("REMINDER_OFFSETS_MINUTES", DEFAULT_REMINDER_OFFSETS).split(",") if m.strip()]
+        if offsets:
+            self.reminders = ReminderScheduler(
+                offsets, os.getenv("REMINDER_OUTBOX", "reminders_outbox.jsonl")
+            )
+            self.reminders.start()
+            self.refresh_reminders()
         
         # Show login screen
         self.show_login_screen()
 
 
+    def connect_primary(self):
+        """Connect to this salon's primary database and any configured read replicas"""
+        shard = self.shard_map.shard_for(self.salon_id)
+        self.db = self.connect_database(shard["host"], shard["database"])
+        self.cursor = self.db.cursor()
+        self.statements = StatementRegistry(self.db)
+
+        # Optional read replicas, e.g. DB_REPLICA_HOSTS=replica1,replica2:3307
+        replicas = []
+        for host in shard["replicas"]:
+            try:
+                replicas.append(self.connect_database(host, shard["database"]))
+            except mysql.connector.Error as err:
+                print(f"Skipping replica {host}: {err}")
+        self.router = ReplicaRouter(self.statements, replicas)
+
+    def refresh_reminders(self):
+        """Apply appointment changes made on any terminal, and move the horizon forward hourly"""
+        if not self.offline:
+            try:
+                self.end_snapshot()
+                if self.reminder_event_id is None:
+                    # Read the log position before the window, so changes made
+                    # while it loads are applied by the next refresh
+                    self.reminder_event_id = self.statements.fetchone("last_event_id")[0]
+                else:
+                    self.apply_reminder_changes()
+
+                horizon_end = datetime.now() + self.reminders.horizon
+                if horizon_end.timestamp() - self.reminders.horizon_end >= REMINDER_ADVANCE.total_seconds():
+                    rows = self.statements.fetchall(
+                        "reminder_window", (self.salon_id, *self.reminders.window_dates(horizon_end))
+                    )
+                    self.reminders.advance(rows, horizon_end)
+            except mysql.connector.Error as err:
+                print(f"Reminder refresh failed: {err}")
+        self.root.after(REMINDER_REFRESH_MS, self.refresh_reminders)
+
+    def apply_reminder_changes(self):
+        """Replay appointment events recorded since the last refresh into the scheduler"""
+        rows = self.statements.fetchall(
+            "appointment_changes", (self.reminder_event_id - REMINDER_EVENT_OVERLAP, self.salon_id)
+        )
+        changes = []
+        for event_id, appointment_id, after in rows:
+            if event_id in self.reminder_events_seen:
+                continue
+            image = json.loads(after) if after else {}
+            changes.append((appointment_id, image.get("appointment_date"),
+                            image.get("start_time"), image.get("status")))
+        self.reminders.apply(changes)
+
+        if rows:
+            self.reminder_event_id = max(self.reminder_event_id, rows[-1][0])
+        self.reminder_events_seen = {
+            row[0] for row in rows if row[0] > self.reminder_event_id - REMINDER_EVENT_OVERLAP
+        }
+
+    def schedule_reminder(self, appointment_id, day, start):
+        if self.reminders:
+            self.reminders.schedule(appointment_id, ReminderScheduler.start_datetime(day, start))
+
+    def cancel_reminder(self, appointment_id):
+        if self.reminders:
+            self.reminders.cancel(appointment_id)
+
+    def go_offline(self):
+        """Serve from the local replica and keep retrying the server in the background"""
+        self.offline = True
+        if self.reconnect_job is None:
+            self.reconnect_job = self.root.after(RECONNECT_INTERVAL_MS, self.try_reconnect)
+
+    def try_reconnect(self):
+        """Reconnect, replay queued bookings and refresh the local replica"""
+        self.reconnect_job = None
+        try:
+            self.connect_primary()
+        except mysql.connector.Error:
+            self.reconnect_job = self.root.after(RECONNECT_INTERVAL_MS, self.try_reconnect)
+            return
+
+        self.offline = False
+        self.sync_outbox()
+        if self.current_user:
+            self.sync_local_replica()
+            self.refresh_all_views()
+            if self.user_type == 'customer':
+                self.show_offline_outcomes()
+
+    def sync_local_replica(self):
+        """Pull the catalog and upcoming appointments into the local replica"""
+        if self.offline:
+            return
+        try:
+            reader = self.router.reader()
+            self.local.replace_services(reader.fetchall("load_services", (self.salon_id,)))
+            self.local.replace_appointments(
+                reader.fetchall("upcoming_appointments", (self.salon_id, datetime.now().date()))
+            )
+        except mysql.connector.Error as err:
+            print(f"Local replica sync failed: {err}")
+            if not self.db.is_connected():
+                self.go_offline()
+
+    def sync_outbox(self):
+        """Replay offline bookings against the server in batches, one transaction each.
+
+        Each booking runs under its own savepoint, so one the server rejects is
+        marked failed without undoing the rest of its batch. When the slot was
+        taken meanwhile, the customer goes on its waitlist instead. Customers
+        are told about both at their next sign-in (show_offline_outcomes).
+        """
+        outcomes = Counter()
+        while True:
+            batch = self.local.queued_bookings(OUTBOX_BATCH_SIZE)
+            if not batch:
+                break
+
+            results = []
+            new_appointments = []
+            try:
+                for outbox_id, customer_id, service_id, provider_id, day, start, end in batch:
+                    self.cursor.execute("SAVEPOINT outbox_booking")
+                    try:
+                        # Same overlap rule as an online booking
+                        if self.find_conflict(provider_id, day, start, end):
+                            self.add_to_waitlist(customer_id, service_id, provider_id, day, start, end)
+                            results.append((outbox_id, "conflict", None))
+                            continue
+                        cursor = self.statements.execute(
+                            "insert_appointment",
+                            (self.salon_id, customer_id, service_id, provider_id, day, start, end)
+                        )
+                    except mysql.connector.Error as err:
+                        # Lost connections and deadlocks end the whole transaction; retry the batch later
+                        if not self.db.is_connected() or err.errno == 1213:
+                            raise
+                        self.cursor.execute("ROLLBACK TO SAVEPOINT outbox_booking")
+                        results.append((outbox_id, "failed", str(err)))
+                        continue
+                    self.events.appointment("booked", after=self.events.image(
+                        EventLog.APPOINTMENT_COLUMNS,
+                        (cursor.lastrowid, self.salon_id, customer_id, service_id, provider_id,
+                         day, start, end, "pending")
+                    ))
+                    results.append((outbox_id, "booked", None))
+                    new_appointments.append((cursor.lastrowid, day, start))
+                self.commit()
+            except mysql.connector.Error as err:
+                print(f"Outbox replay interrupted, bookings stay queued: {err}")
+                if not self.abandon_transaction():
+                    self.go_offline()
+                return
+
+            self.local.finish_bookings(results)
+            for appointment_id, day, start in new_appointments:
+                self.schedule_reminder(appointment_id, day, start)
+            outcomes.update(state for _, state, _ in results)
+
+        if outcomes:
+            print(f"Offline bookings replayed: {outcomes['booked']} booked, "
+                  f"{outcomes['conflict']} waitlisted, {outcomes['failed']} failed")
+
+    def show_offline_outcomes(self):
+        """Tell the signed-in customer about their offline bookings that could not be confirmed"""
+        try:
+            outcomes = self.local.unnotified_outcomes(self.current_user['id'])
+        except sqlite3.Error as err:
+            print(f"Could not read offline booking outcomes: {err}")
+            return
+        if not outcomes:
+            return
+
+        lines = []
+        for outbox_id, service_name, day, start, state, error in outcomes:
+            booking = f"{service_name or 'Your booking'} on {day} at {start[:5]}"
+            if state == "conflict":
+                lines.append(f"{booking}: the slot was taken while this terminal was offline. "
+                             "You're on its waitlist and will be booked if it frees up.")
+            else:
+                lines.append(f"{booking} could not be booked: {error}")
+        messagebox.showwarning("Offline Bookings Not Confirmed", "\n\n".join(lines))
+        self.local.mark_notified([outcome[0] for outcome in outcomes])
+
+    def queue_booking(self, service_id, provider_id, date_obj, start_time, end_time):
+        """Take a booking while offline; it is replayed against the server on reconnect"""
+        if self.local.find_conflict(provider_id, date_obj, start_time, end_time):
+            messagebox.showerror("Error", "Time slot not available. Please choose another time.")
+            return
+
+        self.local.enqueue_booking(
+            self.current_user['id'], service_id, provider_id, date_obj, start_time, end_time
+        )
+        self.load_customer_appointments()
+        messagebox.showinfo(
+            "Saved Offline",
+            "No connection to the server. Your booking is saved on this terminal "
+            "and will be confirmed automatically when the connection returns."
+        )
+
+    def create_tables(self):
+        """Create tables newer than the database's schema.sql import.
+
+        Column and key changes to existing tables need ALTER privileges and are
+        left to `python tenancy.py migrate`.
+        """
+        try:
+            self.cursor.execute(WAITLIST_TABLE)
+        except mysql.connector.Error as err:
+            print(f"Could not create the waitlist table: {err}")
+
+    def commit(self):
+        """Commit the current transaction together with its buffered events"""
+        self.events.flush(self.cursor)
+        self.db.commit()
+        self.router.mark_write()
+
+    def rollback(self):
+        self.events.discard()
+        self.db.rollback()
+
+    def end_snapshot(self):
+        """End the read-only transaction earlier SELECTs opened on the primary.
+
+        The primary is not in autocommit, so its first read fixes a REPEATABLE
+        READ snapshot that lasts until the next commit or rollback; reads meant
+        to see other terminals' latest commits start a fresh one first. Writes
+        are always committed before control returns to Tk, so nothing is lost.
+        """
+        if not self.events.pending:
+            self.db.rollback()
+
+    def abandon_transaction(self):
+        """Undo a failed booking's statements; returns False when the connection itself is gone"""
+        if not self.db.is_connected():
+            self.events.discard()
+            return False
+        self.rollback()
+        return True
+
+    def connect_database(self, host, database):
+        """Open a connection to host[:port] with the credentials from .env"""
+        host, _, port = host.partition(":")
+        return mysql.connector.connect(
+            host=host,
+            port=int(port or 3306),
+            user=os.getenv("DB_USER", "salon_user"),  # Default: salon_user
+            password=os.getenv("DB_PASSWORD"),  # No default! Must be in .env
+            database=database
+        )
+
     def hash_password(self, password):
         """Hash password using SHA-256"""
         return hashlib.sha256(password.encode()).hexdigest()
@@ -198,23 +2050,30 @@ class SalonApp:
         password = self.hash_password(self.password_entry.get())
         user_type = self.login_type.get()
         
+        if self.offline and user_type != 'customer':
+            messagebox.showerror("Offline", "The provider dashboard needs a connection to the server.")
+            return
+
         try:
-            self.cursor.execute(
-                "SELECT id, name, user_type FROM users WHERE username = %s AND password = %s AND user_type = %s",
-                (username, password, user_type)
-            )
-            user = self.cursor.fetchone()
+            if self.offline:
+                user = self.local.find_user(username, password, user_type)
+            else:
+                user = self.statements.fetchone("login", (self.salon_id, username, password, user_type))
+                if user:
+                    self.local.cache_user(user[0], username, password, user_type, user[1])
             
             if user:
                 self.current_user = {
                     'id': user[0],
                     'name': user[1],
-                    'type': user[2]
+                    'type': user[2],
+                    'username': username
                 }
                 self.user_type = user_type
                 
                 if user_type == 'customer':
                     self.show_customer_dashboard()
+                    self.show_offline_outcomes()
                 else:
                     self.show_provider_dashboard()
             else:
@@ -307,24 +2166,35 @@ class SalonApp:
 
     def register(self):
         """Register new user"""
+        if self.offline:
+            messagebox.showerror("Offline", "Registration needs a connection to the server.")
+            return
+
         if self.reg_entries['password'].get() != self.reg_entries['confirm_password'].get():
             messagebox.showerror("Error", "Passwords don't match")
             return
         
+        location = self.reg_entries['location'].get()
+        latitude, longitude = geocode(location) or (None, None)
+
         try:
             self.cursor.execute(
-                "INSERT INTO users (username, password, user_type, name, phone, email, location) VALUES (%s, %s, %s, %s, %s, %s, %s)",
+                "INSERT INTO users (salon_id, username, password, user_type, name, phone, email, location, latitude, longitude) "
+                "VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)",
                 (
+                    self.salon_id,
                     self.reg_entries['username'].get(),
                     self.hash_password(self.reg_entries['password'].get()),
                     self.reg_type.get(),
                     self.reg_entries['name'].get(),
                     self.reg_entries['phone'].get(),
                     self.reg_entries['email'].get(),
-                    self.reg_entries['location'].get()
+                    location,
+                    latitude,
+                    longitude
                 )
             )
-            self.db.commit()
+            self.commit()
             messagebox.showinfo("Success", "Registration successful!")
             self.show_login_screen()
         except mysql.connector.Error as err:
@@ -336,6 +2206,9 @@ class SalonApp:
     def show_customer_dashboard(self):
         """Display beautifully styled customer dashboard"""
         self.clear_window()
+
+        # Browsing reads from the local replica, so refresh it once per visit
+        self.sync_local_replica()
         
         # Configure main window background
         self.root.configure(bg=self.colors["bg"])
@@ -462,23 +2335,25 @@ class SalonApp:
             self.customer_appointments_tree.delete(row)
 
         try:
-            self.cursor.execute("""
-                SELECT a.id, s.service_name, u.name, a.appointment_date, 
-                    a.start_time, a.end_time, a.status
-                FROM appointments a
-                JOIN services s ON a.service_id = s.id
-                JOIN users u ON a.provider_id = u.id
-                WHERE a.customer_id = %s
-                ORDER BY a.appointment_date, a.start_time
-            """, (self.current_user['id'],))
+            if self.offline:
+                appointments = self.local.customer_appointments(self.current_user['id'])
+            else:
+                appointments = self.router.reader().fetchall(
+                    "customer_appointments",
+                    (self.current_user['id'], self.listing_start_date())
+                )
             
-            for appt in self.cursor.fetchall():
+            for appt in appointments:
                 self.customer_appointments_tree.insert("", "end", values=appt)
         except mysql.connector.Error as err:
             messagebox.showerror("Error", f"Failed to load appointments: {err}")
 
 
 
+    def listing_start_date(self):
+        """Earliest appointment date shown in listings"""
+        return datetime.now().date() - timedelta(days=LISTING_HISTORY_DAYS)
+
     def setup_services_tab(self, parent):
         """Improved services tab with booking functionality showing provider username"""
         ttk.Label(parent, text="Browse Services", font=('Arial', 12, 'bold')).pack(pady=10)
@@ -500,9 +2375,30 @@ class SalonApp:
         service_dropdown.pack(side=tk.LEFT, padx=5)
         
         ttk.Button(filter_frame, text="Filter", command=self.filter_services).pack(side=tk.LEFT, padx=5)
+
+        ttk.Label(filter_frame, text="Search:").pack(side=tk.LEFT, padx=5)
+        self.search_var = tk.StringVar()
+        self.search_var.trace_add("write", lambda *args: self.schedule_search())
+        ttk.Entry(filter_frame, textvariable=self.search_var, width=30).pack(side=tk.LEFT, padx=5)
+
+        # "Near me" filters backed by the provider k-d tree
+        near_frame = ttk.Frame(parent)
+        near_frame.pack(fill=tk.X, pady=5)
+
+        ttk.Label(near_frame, text="Near:").pack(side=tk.LEFT, padx=5)
+        self.near_var = tk.StringVar()
+        near_dropdown = ttk.Combobox(near_frame, textvariable=self.near_var)
+        near_dropdown['values'] = sorted(GEOCODES)
+        near_dropdown.pack(side=tk.LEFT, padx=5)
+
+        ttk.Label(near_frame, text="Within (km):").pack(side=tk.LEFT, padx=5)
+        self.radius_var = tk.StringVar()
+        ttk.Entry(near_frame, textvariable=self.radius_var, width=8).pack(side=tk.LEFT, padx=5)
+
+        ttk.Button(near_frame, text="Find Nearby", command=self.search_services).pack(side=tk.LEFT, padx=5)
         
         # Services treeview with provider username instead of description
-        columns = ("ID", "Service", "Provider", "Price", "Duration", "Location")
+        columns = ("ID", "Service", "Provider", "Price", "Duration", "Location", "Distance")
         self.services_tree = ttk.Treeview(
             parent, 
             columns=columns, 
@@ -512,7 +2408,7 @@ class SalonApp:
         )
         
         # Configure columns
-        col_widths = [50, 150, 150, 80, 80, 100]  # Adjust as needed
+        col_widths = [50, 150, 150, 80, 80, 100, 80]  # Adjust as needed
         for col, width in zip(columns, col_widths):
             self.services_tree.heading(col, text=col)
             self.services_tree.column(col, width=width, anchor="center")
@@ -540,52 +2436,154 @@ class SalonApp:
         ttk.Button(booking_frame, 
                 text="Book Appointment", 
                 command=self.book_appointment).pack(side=tk.LEFT, padx=5)
+
+        ttk.Button(booking_frame,
+                text="Book Any Provider",
+                command=self.book_any_provider).pack(side=tk.LEFT, padx=5)
         
         # Load initial services
         self.load_services()
 
     def get_unique_provider_locations(self):
         """Fetch unique provider locations from the database"""
-        self.cursor.execute("SELECT DISTINCT location FROM users WHERE user_type = 'provider'")
-        return [loc[0] for loc in self.cursor.fetchall()]
+        if self.offline:
+            return sorted({service[5] for service in self.local.services() if service[5]})
+        return [loc[0] for loc in self.router.reader().fetchall("provider_locations", (self.salon_id,))]
         
     def get_unique_service_types(self):
         """Fetch unique service types from the database"""
-        self.cursor.execute("SELECT DISTINCT service_name FROM services")
-        return [st[0] for st in self.cursor.fetchall()]
+        if self.offline:
+            return sorted({service[1] for service in self.local.services()})
+        return [st[0] for st in self.router.reader().fetchall("service_types", (self.salon_id,))]
 
     def filter_services(self):
         """Fetch and display filtered services with provider username"""
+        if self.offline:
+            self.search_services()  # Same filters, applied to the local replica
+            return
+
         location = self.location_var.get()
         service_type = self.service_var.get()
 
-        query = """
-            SELECT s.id, s.service_name, u.username, s.price, s.duration, u.location
-            FROM services s
-            JOIN users u ON s.provider_id = u.id
-            WHERE 1=1
-        """
-        params = []
+        # Map the filter combination onto one of the fixed prepared statements
+        statement = "filter_services"
+        params = [self.salon_id]
 
         if location:
-            query += " AND u.location = %s"
+            statement += "_location"
             params.append(location)
 
         if service_type:
-            query += " AND s.service_name = %s"
+            statement += "_type"
             params.append(service_type)
 
-        self.cursor.execute(query, params)
-        self.update_services_tree(self.cursor.fetchall())
+        self.update_services_tree(self.router.reader().fetchall(statement, params))
 
     def load_services(self):
-        """Load all services with provider username"""
-        self.cursor.execute("""
-            SELECT s.id, s.service_name, u.username, s.price, s.duration, u.location
-            FROM services s
-            JOIN users u ON s.provider_id = u.id
-        """)
-        self.update_services_tree(self.cursor.fetchall())
+        """Load all services from the local replica and rebuild the search index if they changed"""
+        services = self.local.services()
+        catalog = {service[0]: service for service in services}
+        if catalog != self.catalog:
+            self.catalog = catalog
+            self.index_generation += 1
+            threading.Thread(
+                target=self.build_search_index, args=(self.index_generation, services), daemon=True
+            ).start()
+            if self.index_job is None:
+                self.index_job = self.root.after(50, self.install_search_index)
+        if not self.offline:
+            self.load_provider_locator()
+        self.update_services_tree([service[:6] for service in services])
+
+    def build_search_index(self, generation, services):
+        """Worker thread: index a catalog snapshot; install_search_index swaps it in"""
+        index = ServiceSearchIndex()
+        index.build(services)
+        self.built_index = (generation, index)
+
+    def install_search_index(self):
+        """Poll from the Tk thread until the index for the latest catalog is built"""
+        self.index_job = None
+        built = self.built_index
+        if built is None or built[0] != self.index_generation:
+            self.index_job = self.root.after(50, self.install_search_index)
+            return
+
+        self.search_index, self.built_index = built[1], None
+        # Re-run a search typed while the old index was still in use
+        if hasattr(self, "services_tree") and self.services_tree.winfo_exists() and self.search_var.get().strip():
+            self.search_services()
+
+    def load_provider_locator(self):
+        """Build the spatial index from stored coordinates, geocoding older rows on the fly"""
+        providers = []
+        for provider_id, location, latitude, longitude in self.router.reader().fetchall("provider_coordinates", (self.salon_id,)):
+            if latitude is None or longitude is None:
+                coords = geocode(location)
+                if not coords:
+                    continue
+                latitude, longitude = coords
+            providers.append((provider_id, float(latitude), float(longitude)))
+        self.provider_locator.build(providers)
+
+    def schedule_search(self):
+        """Debounce keystrokes so the index is only queried once typing pauses"""
+        if self.search_job is not None:
+            self.root.after_cancel(self.search_job)
+        self.search_job = self.root.after(200, self.search_services)
+
+    def search_services(self):
+        """Show services ranked by the search box, narrowed by the filters and distance"""
+        self.search_job = None
+        text = self.search_var.get().strip()
+        location = self.location_var.get()
+        service_type = self.service_var.get()
+        near = self.near_var.get().strip()
+
+        if text:
+            # Filtered inside the index, before the page is cut; near-me ranks
+            # providers from every match and cuts the page after the distance filter
+            filters = {column: value for column, value in ((1, service_type), (5, location)) if value}
+            services = self.search_index.search(
+                text, limit=None if near else ServiceSearchIndex.PAGE_SIZE, filters=filters
+            )
+        else:
+            services = [service for service in sorted(self.catalog.values())
+                        if (not location or service[5] == location)
+                        and (not service_type or service[1] == service_type)]
+
+        if not near:
+            self.update_services_tree([service[:6] for service in services])
+            return
+
+        coords = geocode(near)
+        if not coords:
+            messagebox.showerror("Error", f"Unknown location: {near}")
+            return
+
+        radius = self.radius_var.get().strip()
+        if radius:
+            try:
+                matches = self.provider_locator.within(*coords, float(radius))
+            except ValueError:
+                messagebox.showerror("Error", "Please enter the distance in km (e.g., 5)")
+                return
+        else:
+            # Nearest among the providers still offering a matching service
+            matches = self.provider_locator.nearest(
+                *coords, candidates={service[7] for service in services}
+            )
+
+        distances = dict(matches)
+        services = [service for service in services if service[7] in distances]
+        if text:
+            services = services[:ServiceSearchIndex.PAGE_SIZE]
+        else:
+            services.sort(key=lambda service: distances[service[7]])
+
+        self.update_services_tree(
+            [service[:6] + (f"{distances[service[7]]:.1f} km",) for service in services]
+        )
 
     def update_services_tree(self, services):
         """Update the treeview with services data"""
@@ -604,36 +2602,19 @@ class SalonApp:
         # 2. Get selected service details
         service_values = self.services_tree.item(selected, "values")
         service_id = service_values[0]
-        date_str = self.calendar.get_date()  # Get date as string from calendar
-        time_str = self.time_var.get()
 
-        # 3. Validate time format
-        try:
-            # Parse time separately first
-            datetime.strptime(time_str, "%H:%M")
-        except ValueError:
-            messagebox.showerror("Error", "Please enter time in HH:MM format (e.g., 14:30)")
+        # 3-4. Validate time format and parse the date from calendar
+        slot = self.parse_booking_slot()
+        if not slot:
             return
+        date_obj, start_clock = slot
 
         try:
-            # 4. Parse the date from calendar (handles different date formats)
-            try:
-                # Try parsing with month-first format (common in US)
-                date_obj = datetime.strptime(date_str, "%m/%d/%y").date()
-            except ValueError:
-                try:
-                    # Try parsing with day-first format (common in other countries)
-                    date_obj = datetime.strptime(date_str, "%d/%m/%y").date()
-                except ValueError:
-                    messagebox.showerror("Error", f"Invalid date format: {date_str}. Please use MM/DD/YY or DD/MM/YY")
-                    return
-
             # 5. Get service duration and provider ID
-            self.cursor.execute(
-                "SELECT duration, provider_id FROM services WHERE id = %s",
-                (service_id,)
-            )
-            service_data = self.cursor.fetchone()
+            if self.offline:
+                service_data = self.local.service_booking_info(service_id)
+            else:
+                service_data = self.statements.fetchone("service_booking_info", (service_id,))
             if not service_data:
                 messagebox.showerror("Error", "Selected service not found")
                 return
@@ -641,55 +2622,35 @@ class SalonApp:
             duration, provider_id = service_data
 
             # 6. Combine date and time
-            start_datetime = datetime.combine(date_obj, datetime.strptime(time_str, "%H:%M").time())
+            start_datetime = datetime.combine(date_obj, start_clock)
             end_datetime = start_datetime + timedelta(minutes=duration)
             start_time = start_datetime.time()
             end_time = end_datetime.time()
 
-            # 7. Check for time slot availability
-            self.cursor.execute(
-                """
-                SELECT id FROM appointments 
-                WHERE provider_id = %s 
-                AND appointment_date = %s 
-                AND (
-                    (start_time <= %s AND end_time > %s) OR
-                    (start_time < %s AND end_time >= %s) OR
-                    (start_time >= %s AND end_time <= %s)
-                )
-                """,
-                (
-                    provider_id, 
-                    date_obj,  # Use date_obj instead of date
-                    start_time, 
-                    start_time,
-                    end_time, 
-                    end_time,
-                    start_time, 
-                    end_time
+            if not within_bookable_hours(start_datetime, end_datetime):
+                messagebox.showerror(
+                    "Error", f"Appointments must start and finish between {bookable_hours_text()}."
                 )
-            )
-            if self.cursor.fetchone():
-                messagebox.showerror("Error", "Time slot not available. Please choose another time.")
+                return
+
+            if self.offline:
+                self.queue_booking(service_id, provider_id, date_obj, start_time, end_time)
+                return
+
+            # 7. Check for time slot availability, offering the waitlist if taken
+            self.end_snapshot()
+            if self.find_conflict(provider_id, date_obj, start_time, end_time):
+                if messagebox.askyesno(
+                    "Time slot not available",
+                    "Time slot not available. Please choose another time.\n\n"
+                    "Or join the waitlist to be booked automatically if this slot frees up?"
+                ):
+                    self.join_waitlist(service_id, provider_id, date_obj, start_time, end_time)
                 return
 
             # 8. Insert the appointment
-            self.cursor.execute(
-                """
-                INSERT INTO appointments 
-                (customer_id, service_id, provider_id, appointment_date, start_time, end_time, status)
-                VALUES (%s, %s, %s, %s, %s, %s, 'pending')
-                """,
-                (
-                    self.current_user['id'],
-                    service_id,
-                    provider_id,
-                    date_obj,  # Use date_obj instead of date
-                    start_time.strftime("%H:%M:%S"),
-                    end_time.strftime("%H:%M:%S")
-                )
-            )
-            self.db.commit()
+            self.insert_booking(service_id, provider_id, date_obj, start_time, end_time,
+                                service_values[1], service_values[2])
 
             # Debug output
             print("Appointment booked successfully!")
@@ -700,11 +2661,234 @@ class SalonApp:
             self.refresh_all_views()
             
             messagebox.showinfo("Success", "Appointment booked successfully!")
+
+        except mysql.connector.Error as e:
+            if self.abandon_transaction():
+                messagebox.showerror("Error", f"Failed to book appointment: {str(e)}")
+                print("Error:", str(e))
+                return
+            # Lost the server mid-booking: retry against the local replica
+            self.go_offline()
+            self.book_appointment()
         
         except Exception as e:
+            if not self.offline:
+                self.abandon_transaction()
             messagebox.showerror("Error", f"Failed to book appointment: {str(e)}")
             print("Error:", str(e))
 
+    def parse_booking_slot(self):
+        """Read the calendar date and HH:MM time, or show an error and return None"""
+        date_str = self.calendar.get_date()  # Get date as string from calendar
+        time_str = self.time_var.get()
+
+        try:
+            start_clock = datetime.strptime(time_str, "%H:%M").time()
+        except ValueError:
+            messagebox.showerror("Error", "Please enter time in HH:MM format (e.g., 14:30)")
+            return None
+
+        # Month-first (common in US), then day-first (common in other countries)
+        for date_format in ("%m/%d/%y", "%d/%m/%y"):
+            try:
+                return datetime.strptime(date_str, date_format).date(), start_clock
+            except ValueError:
+                continue
+
+        messagebox.showerror("Error", f"Invalid date format: {date_str}. Please use MM/DD/YY or DD/MM/YY")
+        return None
+
+    def insert_booking(self, service_id, provider_id, date_obj, start_time, end_time,
+                       service_name, provider_name):
+        """Insert and commit a booking for the current customer, then update local state"""
+        cursor = self.statements.execute(
+            "insert_appointment",
+            (
+                self.salon_id,
+                self.current_user['id'],
+                service_id,
+                provider_id,
+                date_obj,
+                start_time.strftime("%H:%M:%S"),
+                end_time.strftime("%H:%M:%S")
+            )
+        )
+        self.events.appointment("booked", after=self.events.image(
+            EventLog.APPOINTMENT_COLUMNS,
+            (cursor.lastrowid, self.salon_id, self.current_user['id'], service_id, provider_id,
+             date_obj, start_time, end_time, "pending")
+        ))
+        self.commit()
+        self.local.store_appointment((
+            cursor.lastrowid, self.current_user['id'], service_id, provider_id, date_obj,
+            start_time, end_time, 'pending', service_name, provider_name
+        ))
+        self.schedule_reminder(cursor.lastrowid, date_obj, start_time)
+        return cursor.lastrowid
+
+    def book_any_provider(self):
+        """Book the selected service type with the best available provider at the location"""
+        selected = self.services_tree.selection()
+        if selected:
+            service_values = self.services_tree.item(selected, "values")
+            service_name, location = service_values[1], service_values[5]
+        else:
+            service_name, location = self.service_var.get(), self.location_var.get()
+
+        if not service_name:
+            messagebox.showerror("Error", "Please select a service or choose a service type")
+            return
+
+        if self.offline:
+            messagebox.showerror("Offline", "Choosing a provider automatically needs a connection to the server.")
+            return
+
+        slot = self.parse_booking_slot()
+        if not slot:
+            return
+        date_obj, start_clock = slot
+        start_datetime = datetime.combine(date_obj, start_clock)
+
+        # (service_id, provider_id, duration) for every provider offering this service here
+        candidates = [
+            (service[0], service[7], service[4]) for service in self.catalog.values()
+            if service[1] == service_name and (not location or service[5] == location)
+        ]
+        providers = {service[7]: service[2] for service in self.catalog.values()}
+        if candidates and not any(within_bookable_hours(start_datetime, start_datetime + timedelta(minutes=duration))
+                                  for _, _, duration in candidates):
+            messagebox.showerror("Error", f"Appointments must start and finish between {bookable_hours_text()}.")
+            return
+
+        try:
+            # Fresh from the primary: other terminals book, cancel and reschedule too
+            self.end_snapshot()
+            self.occupancy.load_day(date_obj, self.statements.fetchall("day_occupancy", (self.salon_id, date_obj)))
+            history = dict(self.statements.fetchall("customer_provider_history", (self.current_user['id'],)))
+
+            for score, service_id, provider_id, duration in self.occupancy.rank(
+                    candidates, date_obj, start_clock, history):
+                end_datetime = start_datetime + timedelta(minutes=duration)
+                if not within_bookable_hours(start_datetime, end_datetime):
+                    continue    # This provider's version of the service runs past closing
+                start_time = start_datetime.time()
+                end_time = end_datetime.time()
+
+                # Another terminal may have booked since the day was read
+                self.end_snapshot()
+                if self.find_conflict(provider_id, date_obj, start_time, end_time):
+                    continue
+
+                self.insert_booking(service_id, provider_id, date_obj, start_time, end_time,
+                                    service_name, providers[provider_id])
+                self.refresh_all_views()
+                messagebox.showinfo("Success", f"Appointment booked with {providers[provider_id]}!")
+                return
+
+            messagebox.showerror("Error", "No provider is free at that time. Please choose another time.")
+        except mysql.connector.Error as err:
+            self.abandon_transaction()
+            messagebox.showerror("Database Error", f"Failed to book appointment: {err}")
+
+    def find_conflict(self, provider_id, date_obj, start_time, end_time):
+        """Return the id of an active appointment overlapping the slot, or None"""
+        conflict = self.statements.fetchone(
+            "find_conflict",
+            (
+                provider_id, 
+                date_obj,
+                start_time, 
+                start_time,
+                end_time, 
+                end_time,
+                start_time, 
+                end_time
+            )
+        )
+        return conflict[0] if conflict else None
+
+    def add_to_waitlist(self, customer_id, service_id, provider_id, day, start, end):
+        """Queue a customer for a slot that is already taken, inside the caller's transaction"""
+        self.cursor.execute(
+            """
+            INSERT INTO waitlist
+            (salon_id, customer_id, service_id, provider_id, requested_date, requested_start, requested_end)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+            """,
+            (self.salon_id, customer_id, service_id, provider_id, day, start, end)
+        )
+
+    def join_waitlist(self, service_id, provider_id, date_obj, start_time, end_time):
+        """Queue the current customer for a slot that is already taken"""
+        try:
+            self.add_to_waitlist(
+                self.current_user['id'], service_id, provider_id, date_obj,
+                start_time.strftime("%H:%M:%S"), end_time.strftime("%H:%M:%S")
+            )
+            self.commit()
+            messagebox.showinfo("Waitlist", "You're on the waitlist. We'll book you if the slot frees up.")
+        except mysql.connector.Error as err:
+            self.abandon_transaction()
+            messagebox.showerror("Database Error", f"Error joining waitlist: {err}")
+
+    def backfill_slot(self, appointment_id):
+        """Book waiting customers into a cancelled appointment's slot.
+
+        Runs inside the caller's transaction. Requests that fit inside the freed
+        slot are matched through idx_waitlist_match and served first come, first
+        served. Returns (appointment_id, date, start_time) of the new bookings.
+        """
+        self.cursor.execute(
+            "SELECT provider_id, appointment_date, start_time, end_time FROM appointments WHERE id = %s",
+            (appointment_id,)
+        )
+        freed = self.cursor.fetchone()
+        if not freed:
+            return []
+
+        provider_id, date_obj, start_time, end_time = freed
+        try:
+            self.cursor.execute(
+                """
+                SELECT id, customer_id, service_id, requested_start, requested_end
+                FROM waitlist
+                WHERE provider_id = %s
+                AND requested_date = %s
+                AND status = 'waiting'
+                AND requested_start >= %s
+                AND requested_end <= %s
+                ORDER BY created_at, id
+                FOR UPDATE
+                """,
+                (provider_id, date_obj, start_time, end_time)
+            )
+        except mysql.connector.Error as err:
+            if err.errno == 1146:  # No waitlist table yet: nobody is waiting
+                return []
+            raise
+
+        booked = []
+        for waitlist_id, customer_id, service_id, requested_start, requested_end in self.cursor.fetchall():
+            if self.find_conflict(provider_id, date_obj, requested_start, requested_end):
+                continue
+
+            cursor = self.statements.execute(
+                "insert_appointment",
+                (self.salon_id, customer_id, service_id, provider_id, date_obj, requested_start, requested_end)
+            )
+            self.events.appointment("booked", after=self.events.image(
+                EventLog.APPOINTMENT_COLUMNS,
+                (cursor.lastrowid, self.salon_id, customer_id, service_id, provider_id,
+                 date_obj, requested_start, requested_end, "pending")
+            ))
+            self.cursor.execute(
+                "UPDATE waitlist SET status = 'booked' WHERE id = %s",
+                (waitlist_id,)
+            )
+            booked.append((cursor.lastrowid, date_obj, requested_start))
+
+        return booked
+
     def refresh_all_views(self):
         """Refresh all relevant views"""
         # Refresh customer view
@@ -729,6 +2913,7 @@ class SalonApp:
     def show_provider_dashboard(self):
         """Display service provider dashboard"""
         self.clear_window()
+        self.calendar_view = None
         
         # Main frames
         header_frame = ttk.Frame(self.root)
@@ -743,6 +2928,9 @@ class SalonApp:
                  font=('Arial', 14, 'bold')).pack(side=tk.LEFT)
         
         ttk.Button(header_frame, text="Logout", command=self.logout).pack(side=tk.RIGHT)
+
+        # All tabs read appointments from the columnar store
+        self.load_appointment_store()
         
         # Navigation tabs
         tab_control = ttk.Notebook(content_frame)
@@ -751,6 +2939,11 @@ class SalonApp:
         appointments_tab = ttk.Frame(tab_control)
         self.setup_provider_appointments_tab(appointments_tab)
         tab_control.add(appointments_tab, text="Appointments")
+
+        # Calendar Tab
+        calendar_tab = ttk.Frame(tab_control)
+        self.setup_calendar_tab(calendar_tab)
+        tab_control.add(calendar_tab, text="Calendar")
         
         # Services Management Tab
         services_tab = ttk.Frame(tab_control)
@@ -770,7 +2963,8 @@ class SalonApp:
 
         # Table for appointments
         columns = ("ID", "Customer", "Service", "Date", "Start Time", "End Time", "Status", "Actions")
-        self.appointments_tree = ttk.Treeview(parent, columns=columns, show="headings", height=10)
+        self.appointments_tree = ttk.Treeview(parent, columns=columns, show="headings", height=10,
+                                              selectmode="extended")
 
         for col in columns:
             self.appointments_tree.heading(col, text=col)
@@ -790,51 +2984,209 @@ class SalonApp:
         ttk.Button(parent, text="Refresh", command=self.load_provider_appointments).pack(pady=5)
 
         # Load appointments initially
+        self.render_provider_appointments()
+
+    def setup_calendar_tab(self, parent):
+        """Setup provider calendar tab"""
+        ttk.Label(parent, text="Drag an appointment to reschedule it",
+                  font=('Arial', 10)).pack(pady=5)
+
+        self.calendar_view = ProviderCalendar(
+            parent,
+            self.appointment_store,
+            self.current_user['id'],
+            lambda customer_id, service_id: (
+                f"{self.customer_names.get(customer_id, customer_id)}\n"
+                f"{self.service_names.get(service_id, service_id)}"
+            ),
+            self.reschedule_appointment
+        )
+
+    def reschedule_appointment(self, appointment_id, day, start, end):
+        """Move an appointment after the calendar validated it locally; False if refused"""
+        start_time = f"{start // 60:02d}:{start % 60:02d}:00"
+        end_time = f"{end // 60:02d}:{end % 60:02d}:00"
+        provider_id = self.current_user['id']
+
+        try:
+            # The store may be stale if customers booked since the dashboard
+            # loaded, and so may the snapshot its reads opened: check in a fresh
+            # one, with the target day locked against new bookings
+            self.end_snapshot()
+            self.statements.fetchall("lock_provider_day", (provider_id, day))
+            conflict = self.statements.fetchone(
+                "reschedule_conflict",
+                (provider_id, day, appointment_id,
+                 start_time, start_time, end_time, end_time, start_time, end_time)
+            )
+            if conflict:
+                self.rollback()
+                messagebox.showerror("Error", "That time overlaps another appointment.")
+                return False
+
+            locked = self.statements.fetchone("lock_appointment", (appointment_id,))
+            cursor = self.statements.execute(
+                "reschedule_appointment", (day, start_time, end_time, appointment_id, provider_id)
+            )
+            if cursor.rowcount != 1:
+                self.rollback()
+                return False
+            before = self.events.image(EventLog.APPOINTMENT_COLUMNS, locked)
+            self.events.appointment("rescheduled", before, dict(
+                before, appointment_date=day.isoformat(), start_time=start_time, end_time=end_time
+            ))
+            self.commit()
+        except mysql.connector.Error as err:
+            self.rollback()
+            messagebox.showerror("Database Error", f"Error rescheduling appointment: {err}")
+            return False
+
+        self.appointment_store.reschedule(appointment_id, day, start, end)
+        self.schedule_reminder(appointment_id, day, start_time)
+
+        item = str(appointment_id)
+        if self.appointments_tree.exists(item):
+            values = list(self.appointments_tree.item(item, "values"))
+            values[3:6] = [day, start_time, end_time]
+            self.appointments_tree.item(item, values=values)
+        return True
+
+    def load_appointment_store(self):
+        """Load the provider's appointments and display names into memory"""
+        provider_id = self.current_user['id']
+        try:
+            reader = self.router.reader()
+            self.appointment_store.load(
+                reader.fetchall("provider_store", (provider_id, self.listing_start_date()))
+            )
+            self.customer_names = dict(reader.fetchall("provider_customer_names", (provider_id,)))
+            self.service_names = {
+                service[0]: service[1] for service in reader.fetchall("provider_services", (provider_id,))
+            }
+        except mysql.connector.Error as err:
+            messagebox.showerror("Error", f"Failed to load appointments: {err}")
+
     def load_provider_appointments(self):
         """Refresh provider appointments with proper query"""
+        if self.user_type != 'provider':
+            return
+        self.load_appointment_store()
+        self.render_provider_appointments()
+
+    def render_provider_appointments(self):
+        """Fill the appointments table from the columnar store"""
+        if self.calendar_view:
+            self.calendar_view.refresh()
+
+        if not hasattr(self, 'appointments_tree'):
+            return
+
         for row in self.appointments_tree.get_children():
             self.appointments_tree.delete(row)
 
-        try:
-            self.cursor.execute("""
-                SELECT a.id, c.name, s.service_name, a.appointment_date,
-                    a.start_time, a.end_time, a.status
-                FROM appointments a
-                JOIN users c ON a.customer_id = c.id
-                JOIN services s ON a.service_id = s.id
-                WHERE a.provider_id = %s
-                ORDER BY a.appointment_date, a.start_time
-            """, (self.current_user['id'],))
-            
-            for appt in self.cursor.fetchall():
-                self.appointments_tree.insert("", "end", values=appt)
-        except mysql.connector.Error as err:
-            messagebox.showerror("Error", f"Failed to load appointments: {err}")
+        store = self.appointment_store
+        for row in store.provider_rows(self.current_user['id']):
+            appointment_id, customer_id, service_id, day, start, end, status = store.record(row)
+            # Keyed by appointment id so status changes can patch rows in place
+            self.appointments_tree.insert("", "end", iid=str(appointment_id), values=(
+                appointment_id,
+                self.customer_names.get(customer_id, customer_id),
+                self.service_names.get(service_id, service_id),
+                day, start, end, status
+            ))
 
    
     def change_status(self, new_status):
-        """Change the status of the selected appointment"""
-        selected_item = self.appointments_tree.selection()
+        """Change the status of all selected appointments"""
+        selected_items = self.appointments_tree.selection()
         
-        if not selected_item:
+        if not selected_items:
             messagebox.showwarning("Selection Error", "Please select an appointment.")
             return
 
-        appointment_id = self.appointments_tree.item(selected_item, "values")[0]  # Get appointment ID
-        self.update_appointment_status(appointment_id, new_status)
+        appointment_ids = [int(item) for item in selected_items]
+        self.update_appointment_status(appointment_ids, new_status)
+
+    def apply_status_change(self, appointment_ids, new_status):
+        """Move appointments to new_status in one transaction, skipping illegal transitions.
+
+        Cancelled slots are handed to the waitlist in the same transaction.
+        Returns (updated ids, waitlist bookings); rolls back and re-raises on
+        a database error.
+        """
+        placeholders = ", ".join(["%s"] * len(appointment_ids))
+        backfilled = []
 
-    def update_appointment_status(self, appointment_id, new_status):
-        """Update the status of an appointment"""
         try:
+            # Lock the rows so the transition check sees their committed status
             self.cursor.execute(
-                "UPDATE appointments SET status = %s WHERE id = %s",
-                (new_status, appointment_id)
+                f"SELECT {', '.join(EventLog.APPOINTMENT_COLUMNS)} FROM appointments "
+                f"WHERE id IN ({placeholders}) FOR UPDATE",
+                appointment_ids
             )
-            self.db.commit()
-            messagebox.showinfo("Success", f"Appointment status updated to {new_status}")
-            self.load_provider_appointments()
+            current = {
+                row[0]: self.events.image(EventLog.APPOINTMENT_COLUMNS, row)
+                for row in self.cursor.fetchall()
+            }
+            updated = [
+                appointment_id for appointment_id in appointment_ids
+                if appointment_id in current
+                and new_status in STATUS_TRANSITIONS.get(current[appointment_id]["status"], ())
+            ]
+
+            if updated:
+                self.cursor.execute(
+                    f"UPDATE appointments SET status = %s WHERE id IN ({', '.join(['%s'] * len(updated))})",
+                    [new_status] + updated
+                )
+                for appointment_id in updated:
+                    before = current[appointment_id]
+                    self.events.appointment("status", before, dict(before, status=new_status))
+                if new_status == "cancelled":
+                    for appointment_id in updated:
+                        backfilled += self.backfill_slot(appointment_id)
+            self.commit()
+        except mysql.connector.Error:
+            self.rollback()
+            raise
+        return updated, backfilled
+
+    def update_appointment_status(self, appointment_ids, new_status):
+        """Apply a status change from the provider dashboard and update its views"""
+        try:
+            updated, backfilled = self.apply_status_change(appointment_ids, new_status)
         except mysql.connector.Error as err:
             messagebox.showerror("Database Error", f"Error updating status: {err}")
+            return
+
+        # Finished appointments need no reminders; waitlist bookings get theirs
+        if new_status in ("completed", "cancelled"):
+            for appointment_id in updated:
+                self.cancel_reminder(appointment_id)
+        for appointment_id, day, start in backfilled:
+            self.schedule_reminder(appointment_id, day, start)
+
+        self.appointment_store.set_status(updated, new_status)
+
+        if backfilled:
+            self.load_provider_appointments()  # Show the new waitlist bookings
+        else:
+            if self.calendar_view:
+                self.calendar_view.update_statuses(updated)
+            for appointment_id in updated:
+                item = str(appointment_id)
+                if self.appointments_tree.exists(item):
+                    values = list(self.appointments_tree.item(item, "values"))
+                    values[6] = new_status
+                    self.appointments_tree.item(item, values=values)
+
+        message = f"{len(updated)} appointment(s) updated to {new_status}"
+        skipped = len(appointment_ids) - len(updated)
+        if skipped:
+            message += f"\n{skipped} skipped: cannot change to {new_status} from their current status."
+        if backfilled:
+            message += f"\n{len(backfilled)} waitlisted customer(s) booked into the freed slot(s)."
+        messagebox.showinfo("Success", message)
 
 
     def setup_provider_services_tab(self, parent):
@@ -870,13 +3222,7 @@ class SalonApp:
             self.services_tree.delete(row)  # Clear existing data
 
         try:
-            self.cursor.execute("""
-                SELECT id, service_name, description, price, duration
-                FROM services 
-                WHERE provider_id = %s
-            """, (self.current_user['id'],))
-
-            services = self.cursor.fetchall()
+            services = self.router.reader().fetchall("provider_services", (self.current_user['id'],))
 
             for service in services:
                 self.services_tree.insert("", "end", values=service)
@@ -920,14 +3266,22 @@ class SalonApp:
 
             try:
                 self.cursor.execute(
-                    "INSERT INTO services (service_name, description, price, duration, provider_id) VALUES (%s, %s, %s, %s, %s)",
-                    (service_name, description, price, duration, self.current_user['id'])
+                    "INSERT INTO services (salon_id, service_name, description, price, duration, provider_id) VALUES (%s, %s, %s, %s, %s, %s)",
+                    (self.salon_id, service_name, description, price, duration, self.current_user['id'])
+                )
+                self.events.record(
+                    "service", self.cursor.lastrowid, self.current_user['id'], "created",
+                    after=self.events.image(EventLog.SERVICE_COLUMNS, (
+                        self.cursor.lastrowid, self.salon_id, self.current_user['id'],
+                        service_name, description, price, duration
+                    ))
                 )
-                self.db.commit()
+                self.commit()
                 messagebox.showinfo("Success", "Service added successfully!")
                 popup.destroy()
                 self.load_provider_services()  # Refresh services list
             except mysql.connector.Error as err:
+                self.rollback()
                 messagebox.showerror("Database Error", f"Error adding service: {err}")
 
         ttk.Button(popup, text="Save", command=save_service).pack(pady=10)
@@ -959,22 +3313,36 @@ class SalonApp:
         def update_service():
             """Update service in database"""
             try:
+                changes = {
+                    "service_name": entries["service_name"].get(),
+                    "description": entries["description"].get(),
+                    "price": float(entries["price"].get()),
+                    "duration": int(entries["duration"].get())
+                }
+                before = self.lock_service(service_id)
+                if before is None:
+                    self.rollback()
+                    messagebox.showerror("Error", "This service no longer exists.")
+                    return
+                after = dict(before, **changes)
                 self.cursor.execute("""
                     UPDATE services 
                     SET service_name=%s, description=%s, price=%s, duration=%s
                     WHERE id=%s
                 """, (
-                    entries["service_name"].get(),
-                    entries["description"].get(),
-                    float(entries["price"].get()),
-                    int(entries["duration"].get()),
+                    after["service_name"],
+                    after["description"],
+                    after["price"],
+                    after["duration"],
                     service_id
                 ))
-                self.db.commit()
+                self.events.record("service", before["id"], before["provider_id"], "updated", before, after)
+                self.commit()
                 messagebox.showinfo("Success", "Service updated successfully!")
                 popup.destroy()
                 self.load_provider_services()
             except mysql.connector.Error as err:
+                self.rollback()
                 messagebox.showerror("Database Error", f"Error updating service: {err}")
 
         ttk.Button(popup, text="Update", command=update_service).grid(row=len(fields), column=0, columnspan=2, pady=10)
@@ -991,17 +3359,73 @@ class SalonApp:
         confirm = messagebox.askyesno("Confirm", "Are you sure you want to delete this service?")
         if confirm:
             try:
+                before = self.lock_service(service_id)
+                if before is None:
+                    self.rollback()
+                    self.load_provider_services()
+                    return
+
+                # Keep the deleted appointments in the event log before they go
+                self.cursor.execute(
+                    f"SELECT {', '.join(EventLog.APPOINTMENT_COLUMNS)} FROM appointments "
+                    "WHERE service_id = %s FOR UPDATE",
+                    (service_id,)
+                )
+                for row in self.cursor.fetchall():
+                    self.events.appointment(
+                        "deleted", before=self.events.image(EventLog.APPOINTMENT_COLUMNS, row)
+                    )
+                self.events.record("service", before["id"], before["provider_id"], "deleted", before)
+
+                # Partitioned appointments have no foreign keys, so don't rely on the cascade
+                self.cursor.execute("DELETE FROM appointments WHERE service_id = %s", (service_id,))
                 self.cursor.execute("DELETE FROM services WHERE id = %s", (service_id,))
-                self.db.commit()
+                self.commit()
                 messagebox.showinfo("Success", "Service deleted successfully!")
                 self.load_provider_services()
             except mysql.connector.Error as err:
+                self.rollback()
                 messagebox.showerror("Database Error", f"Error deleting service: {err}")
 
+    def lock_service(self, service_id):
+        """Lock a service row for update and return its event image, or None"""
+        self.cursor.execute(
+            f"SELECT {', '.join(EventLog.SERVICE_COLUMNS)} FROM services WHERE id = %s FOR UPDATE",
+            (service_id,)
+        )
+        row = self.cursor.fetchone()
+        return self.events.image(EventLog.SERVICE_COLUMNS, row) if row else None
+
     def setup_analytics_tab(self, parent):
         """Setup analytics tab"""
-        # Implementation would go here
-        pass
+        ttk.Label(parent, text="Your Analytics", font=('Arial', 12, 'bold')).pack(pady=10)
+
+        self.analytics_figure = plt.Figure(figsize=(9, 4))
+        self.analytics_canvas = FigureCanvasTkAgg(self.analytics_figure, master=parent)
+        self.analytics_canvas.get_tk_widget().pack(fill=tk.BOTH, expand=True, padx=10, pady=5)
+
+        ttk.Button(parent, text="Refresh", command=self.draw_analytics).pack(pady=5)
+
+        self.draw_analytics()
+
+    def draw_analytics(self):
+        """Chart status and weekday breakdowns straight from the appointment store"""
+        provider_id = self.current_user['id']
+        status_counts = self.appointment_store.status_counts(provider_id)
+        weekday_counts = self.appointment_store.weekday_counts(provider_id)
+
+        self.analytics_figure.clear()
+        by_status, by_weekday = self.analytics_figure.subplots(1, 2)
+
+        by_status.bar(list(status_counts), list(status_counts.values()), color=self.colors["primary"])
+        by_status.set_title("Appointments by status")
+
+        by_weekday.bar(["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"], weekday_counts,
+                       color=self.colors["primary"])
+        by_weekday.set_title("Booked appointments by weekday")
+
+        self.analytics_figure.tight_layout()
+        self.analytics_canvas.draw()
 
     def logout(self):
         """Log out current user"""
@@ -1011,9 +3435,15 @@ class SalonApp:
 
     def __del__(self):
         """Clean up database connection when object is destroyed"""
-        if hasattr(self, 'db') and self.db.is_connected():
+        if getattr(self, 'db', None) is not None and self.db.is_connected():
+            self.router.close()
+            self.statements.close()
             self.cursor.close()
             self.db.close()
+        if hasattr(self, 'local'):
+            self.local.close()
+        if getattr(self, 'reminders', None):
+            self.reminders.stop()
 
 if __name__ == "__main__":
     root = tk.Tk()
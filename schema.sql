@@ -2,38 +2,55 @@
 CREATE DATABASE IF NOT EXISTS salon_management;
 USE salon_management;
 
+-- Salons (branches); every user, service and appointment belongs to one
+CREATE TABLE IF NOT EXISTS salons (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    name VARCHAR(100) NOT NULL,
+    location VARCHAR(100),
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+INSERT IGNORE INTO salons (id, name) VALUES (1, 'Main Salon');
+
 -- Users table (customers and providers)
 CREATE TABLE IF NOT EXISTS users (
     id INT AUTO_INCREMENT PRIMARY KEY,
-    username VARCHAR(50) UNIQUE NOT NULL,
+    salon_id INT NOT NULL DEFAULT 1,
+    username VARCHAR(50) NOT NULL,
     password VARCHAR(100) NOT NULL,
     user_type ENUM('customer', 'provider') NOT NULL,
     name VARCHAR(100) NOT NULL,
     phone VARCHAR(20),
     email VARCHAR(100),
     location VARCHAR(100),
+    latitude DECIMAL(9,6) COMMENT 'Geocoded from locations.csv',
+    longitude DECIMAL(9,6) COMMENT 'Geocoded from locations.csv',
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-    INDEX idx_user_type (user_type),
-    INDEX idx_username (username)
+    FOREIGN KEY (salon_id) REFERENCES salons(id),
+    UNIQUE KEY uq_salon_username (salon_id, username),
+    INDEX idx_salon_type_location (salon_id, user_type, location)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
 -- Services table
 CREATE TABLE IF NOT EXISTS services (
     id INT AUTO_INCREMENT PRIMARY KEY,
+    salon_id INT NOT NULL DEFAULT 1,
     service_name VARCHAR(100) NOT NULL,
     description TEXT,
     price DECIMAL(10,2) NOT NULL,
     duration INT NOT NULL COMMENT 'Duration in minutes',
     provider_id INT NOT NULL,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (salon_id) REFERENCES salons(id),
     FOREIGN KEY (provider_id) REFERENCES users(id) ON DELETE CASCADE,
-    INDEX idx_service_name (service_name),
+    INDEX idx_salon_service (salon_id, service_name),
     INDEX idx_provider (provider_id)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
 -- Appointments table
 CREATE TABLE IF NOT EXISTS appointments (
     id INT AUTO_INCREMENT PRIMARY KEY,
+    salon_id INT NOT NULL DEFAULT 1,
     customer_id INT NOT NULL,
     service_id INT NOT NULL,
     provider_id INT NOT NULL,
@@ -43,15 +60,80 @@ CREATE TABLE IF NOT EXISTS appointments (
     status ENUM('pending', 'confirmed', 'completed', 'cancelled') DEFAULT 'pending',
     notes TEXT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    -- Cancelled rows release their start time so the slot can be rebooked
+    active_start_time TIME AS (IF(status = 'cancelled', NULL, start_time)) STORED,
     FOREIGN KEY (customer_id) REFERENCES users(id) ON DELETE CASCADE,
-    FOREIGN KEY (service_id) REFERENCES services(id) ON DELETE CASCADE,
+    -- Services are deleted through the app, which logs their appointments first
+    FOREIGN KEY (service_id) REFERENCES services(id) ON DELETE RESTRICT,
     FOREIGN KEY (provider_id) REFERENCES users(id) ON DELETE CASCADE,
-    INDEX idx_date_status (appointment_date, status),
+    INDEX idx_salon_date_status (salon_id, appointment_date, status),
     INDEX idx_provider_date (provider_id, appointment_date),
-    UNIQUE KEY unique_booking (provider_id, appointment_date, start_time)
+    UNIQUE KEY unique_booking (provider_id, appointment_date, active_start_time)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Waitlist for customers whose requested slot was already taken
+CREATE TABLE IF NOT EXISTS waitlist (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    salon_id INT NOT NULL DEFAULT 1,
+    customer_id INT NOT NULL,
+    service_id INT NOT NULL,
+    provider_id INT NOT NULL,
+    requested_date DATE NOT NULL,
+    requested_start TIME NOT NULL,
+    requested_end TIME NOT NULL,
+    status ENUM('waiting', 'booked') DEFAULT 'waiting',
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (customer_id) REFERENCES users(id) ON DELETE CASCADE,
+    FOREIGN KEY (service_id) REFERENCES services(id) ON DELETE CASCADE,
+    FOREIGN KEY (provider_id) REFERENCES users(id) ON DELETE CASCADE,
+    INDEX idx_waitlist_match (provider_id, requested_date, status, requested_start)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Completed/cancelled appointments moved out of the live table by archive_appointments.py
+CREATE TABLE IF NOT EXISTS appointments_archive (
+    id INT PRIMARY KEY,
+    salon_id INT NOT NULL DEFAULT 1,
+    customer_id INT NOT NULL,
+    service_id INT NOT NULL,
+    provider_id INT NOT NULL,
+    appointment_date DATE NOT NULL,
+    start_time TIME NOT NULL,
+    end_time TIME NOT NULL,
+    status ENUM('pending', 'confirmed', 'completed', 'cancelled') NOT NULL,
+    notes TEXT,
+    created_at TIMESTAMP NULL,
+    archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    INDEX idx_archive_salon_date (salon_id, appointment_date),
+    INDEX idx_archive_provider_date (provider_id, appointment_date),
+    INDEX idx_archive_customer (customer_id)
+) ENGINE=InnoDB ROW_FORMAT=COMPRESSED DEFAULT CHARSET=utf8mb4;
+
+-- Append-only log of appointment and service changes, written in the same
+-- transaction as the change. No foreign keys: history outlives the rows.
+CREATE TABLE IF NOT EXISTS appointment_events (
+    id BIGINT AUTO_INCREMENT PRIMARY KEY,
+    salon_id INT NOT NULL,
+    entity ENUM('appointment', 'service') NOT NULL,
+    entity_id INT NOT NULL,
+    provider_id INT NOT NULL,
+    action VARCHAR(20) NOT NULL COMMENT 'booked, status, rescheduled, created, updated, deleted',
+    before_image JSON NULL,
+    after_image JSON NULL,
+    recorded_at TIMESTAMP(6) DEFAULT CURRENT_TIMESTAMP(6),
+    INDEX idx_events_provider_time (provider_id, recorded_at),
+    INDEX idx_events_entity (entity, entity_id)
+) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
+
+-- Provider schedules captured by event_log.py; replay starts from the latest one
+CREATE TABLE IF NOT EXISTS schedule_snapshots (
+    id INT AUTO_INCREMENT PRIMARY KEY,
+    provider_id INT NOT NULL,
+    taken_at TIMESTAMP(6) NOT NULL,
+    appointments JSON NOT NULL,
+    INDEX idx_snapshots_provider_time (provider_id, taken_at)
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4;
 
 -- Optional: Sample data for testing (commented out)
--- INSERT INTO users (username, password, user_type, name) VALUES 
--- ('admin', SHA2('admin123', 256), 'provider', 'Admin User'),
--- ('customer1', SHA2('customer123', 256), 'customer', 'John Doe');
\ No newline at end of file
+-- INSERT INTO users (salon_id, username, password, user_type, name) VALUES 
+-- (1, 'admin', SHA2('admin123', 256), 'provider', 'Admin User'),
+-- (1, 'customer1', SHA2('customer123', 256), 'customer', 'John Doe');
\ No newline at end of file
@@ -0,0 +1,262 @@
+"""Multi-salon maintenance and cross-salon reporting.
+
+Usage:
+    python tenancy.py migrate
+    python tenancy.py report [--from 2026-10-01] [--to 2026-10-31]
+
+Shards come from the same shard map as salon_app.py (SHARD_MAP, default
+shards.json); without one there is a single shard, the database in .env.
+
+`migrate` upgrades an older database on every shard to schema.sql: it adds
+the provider coordinate columns (geocoding existing providers from
+locations.csv), the waitlist, appointments_archive and event log tables, the
+unique booking key that lets a cancelled start time be rebooked, the salons
+table, a salon_id column (existing rows belong to salon 1) and the
+salon-leading indexes. It is safe to re-run.
+
+`report` runs one aggregate query per shard in parallel and merges the
+results into per-salon appointment counts and completed revenue.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date
+
+import mysql.connector
+from dotenv import load_dotenv
+
+from salon_app import WAITLIST_TABLE, ShardMap, geocode
+
+# (table, column, definition) added to schema.sql after the first release
+ADDED_COLUMNS = (
+    ("users", "latitude", "DECIMAL(9,6) COMMENT 'Geocoded from locations.csv' AFTER location"),
+    ("users", "longitude", "DECIMAL(9,6) COMMENT 'Geocoded from locations.csv' AFTER latitude"),
+)
+
+TENANT_TABLES = ("users", "services", "appointments", "waitlist", "appointments_archive")
+
+# (table, index to drop, index to add, columns): single-column indexes replaced
+# by ones leading with salon_id
+TENANT_INDEXES = (
+    ("users", "username", "uq_salon_username", "UNIQUE KEY uq_salon_username (salon_id, username)"),
+    ("users", "idx_username", "idx_salon_type_location",
+     "INDEX idx_salon_type_location (salon_id, user_type, location)"),
+    ("users", "idx_user_type", None, None),
+    ("services", "idx_service_name", "idx_salon_service", "INDEX idx_salon_service (salon_id, service_name)"),
+    ("appointments", "idx_date_status", "idx_salon_date_status",
+     "INDEX idx_salon_date_status (salon_id, appointment_date, status)"),
+    ("appointments_archive", None, "idx_archive_salon_date",
+     "INDEX idx_archive_salon_date (salon_id, appointment_date)"),
+)
+
+REPORT_QUERY = """
+    SELECT a.salon_id,
+        COUNT(*),
+        SUM(a.status = 'completed'),
+        SUM(a.status = 'cancelled'),
+        COALESCE(SUM(IF(a.status = 'completed', s.price, 0)), 0)
+    FROM appointments a
+    JOIN services s ON a.service_id = s.id
+    WHERE a.appointment_date BETWEEN %s AND %s
+    GROUP BY a.salon_id
+"""
+
+
+def connect(shard):
+    """Connect to a shard from the shard map with the .env credentials"""
+    host, _, port = shard["host"].partition(":")
+    return mysql.connector.connect(
+        host=host,
+        port=int(port or 3306),
+        user=os.getenv("DB_USER", "salon_user"),
+        password=os.getenv("DB_PASSWORD"),
+        database=shard["database"]
+    )
+
+
+def scatter(shard_map, job, *args):
+    """Run job(db, *args) on every shard at once; returns {shard: result or exception}"""
+    def run(name):
+        db = connect(shard_map.shard(name))
+        try:
+            return job(db, *args)
+        finally:
+            db.close()
+
+    names = shard_map.names()
+    results = {}
+    with ThreadPoolExecutor(max_workers=len(names)) as pool:
+        futures = {pool.submit(run, name): name for name in names}
+        for future in as_completed(futures):
+            try:
+                results[futures[future]] = future.result()
+            except mysql.connector.Error as err:
+                results[futures[future]] = err
+    return results
+
+
+def has_column(cursor, table, column):
+    cursor.execute(
+        "SELECT COUNT(*) FROM information_schema.columns "
+        "WHERE table_schema = DATABASE() AND table_name = %s AND column_name = %s",
+        (table, column)
+    )
+    return cursor.fetchone()[0] > 0
+
+
+def table_names(cursor):
+    cursor.execute("SELECT table_name FROM information_schema.tables WHERE table_schema = DATABASE()")
+    return {row[0] for row in cursor.fetchall()}
+
+
+def index_names(cursor, table):
+    cursor.execute(
+        "SELECT DISTINCT index_name FROM information_schema.statistics "
+        "WHERE table_schema = DATABASE() AND table_name = %s",
+        (table,)
+    )
+    return {row[0] for row in cursor.fetchall()}
+
+
+def migrate_shard(db):
+    """Bring one database up to schema.sql; returns the changes made"""
+    cursor = db.cursor()
+    changes = []
+
+    for table, column, definition in ADDED_COLUMNS:
+        if not has_column(cursor, table, column):
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+            changes.append(f"{table}.{column}")
+
+    # Providers registered before coordinates were stored
+    cursor.execute(
+        "SELECT id, location FROM users WHERE user_type = 'provider' AND latitude IS NULL"
+    )
+    geocoded = [(*coords, provider_id) for provider_id, location in cursor.fetchall()
+                if (coords := geocode(location))]
+    if geocoded:
+        cursor.executemany("UPDATE users SET latitude = %s, longitude = %s WHERE id = %s", geocoded)
+        changes.append(f"{len(geocoded)} providers geocoded")
+
+    if not has_column(cursor, "appointments", "active_start_time"):
+        # The old unique_booking covered start_time, so a cancelled booking
+        # blocked its start time for good; the new key ignores cancelled rows
+        cursor.execute("""
+            ALTER TABLE appointments
+            ADD COLUMN active_start_time TIME AS (IF(status = 'cancelled', NULL, start_time)) STORED,
+            DROP INDEX unique_booking,
+            ADD UNIQUE KEY unique_booking (provider_id, appointment_date, active_start_time)
+        """)
+        changes.append("appointments.active_start_time, unique_booking")
+
+    # Imported here because both scripts import connect() from this module
+    from archive_appointments import ARCHIVE_TABLE
+    from event_log import TABLES as EVENT_TABLES
+
+    tables = table_names(cursor)
+    added_tables = (("waitlist", WAITLIST_TABLE), ("appointments_archive", ARCHIVE_TABLE),
+                    ("appointment_events", EVENT_TABLES[0]), ("schedule_snapshots", EVENT_TABLES[1]))
+    for table, definition in added_tables:
+        if table not in tables:
+            cursor.execute(definition)
+            changes.append(table)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS salons (
+            id INT AUTO_INCREMENT PRIMARY KEY,
+            name VARCHAR(100) NOT NULL,
+            location VARCHAR(100),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4
+    """)
+    cursor.execute("INSERT IGNORE INTO salons (id, name) VALUES (1, 'Main Salon')")
+
+    # Skip anything still missing rather than fail the whole shard
+    tables = table_names(cursor)
+    for table in TENANT_TABLES:
+        if table in tables and not has_column(cursor, table, "salon_id"):
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN salon_id INT NOT NULL DEFAULT 1 AFTER id")
+            changes.append(f"{table}.salon_id")
+
+    for table, old, new, definition in TENANT_INDEXES:
+        if table not in tables:
+            continue
+        existing = index_names(cursor, table)
+        alterations = []
+        if new and new not in existing:
+            alterations.append(f"ADD {definition}")
+        if old and old in existing:
+            alterations.append(f"DROP INDEX `{old}`")
+        if alterations:
+            cursor.execute(f"ALTER TABLE {table} " + ", ".join(alterations))
+            changes.extend(f"{table}: {change}" for change in alterations)
+
+    db.commit()
+    return changes
+
+
+def report_shard(db, first_day, last_day):
+    """Per-salon (name, appointments, completed, cancelled, revenue) on one shard"""
+    cursor = db.cursor()
+    cursor.execute("SELECT id, name FROM salons")
+    names = dict(cursor.fetchall())
+    cursor.execute(REPORT_QUERY, (first_day, last_day))
+    return {
+        salon_id: (names.get(salon_id, f"Salon {salon_id}"), int(total), int(completed or 0),
+                   int(cancelled or 0), float(revenue))
+        for salon_id, total, completed, cancelled, revenue in cursor.fetchall()
+    }
+
+
+def report(shard_map, first_day, last_day):
+    start = time.perf_counter()
+    results = scatter(shard_map, report_shard, first_day, last_day)
+    elapsed = (time.perf_counter() - start) * 1000
+
+    salons = {}
+    for shard, result in sorted(results.items()):
+        if isinstance(result, Exception):
+            print(f"Shard {shard} failed, its salons are missing: {result}", file=sys.stderr)
+        else:
+            salons.update(result)
+
+    print(f"{'Salon':<8}{'Name':<28}{'Appointments':>14}{'Completed':>11}{'Cancelled':>11}{'Revenue':>14}")
+    for salon_id, (name, total, completed, cancelled, revenue) in sorted(
+            salons.items(), key=lambda item: -item[1][4]):
+        print(f"{salon_id:<8}{name[:27]:<28}{total:>14}{completed:>11}{cancelled:>11}{revenue:>14.2f}")
+
+    totals = [sum(row[i] for row in salons.values()) for i in range(1, 5)]
+    print(f"{'':<8}{'All salons':<28}{totals[0]:>14}{totals[1]:>11}{totals[2]:>11}{totals[3]:>14.2f}")
+    print(f"\n{len(salons)} salons from {len(results)} shard(s) in {elapsed:.0f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Multi-salon maintenance and reporting")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("migrate", help="upgrade every shard to the current schema")
+
+    today = date.today()
+    report_parser = commands.add_parser("report", help="appointments and revenue per salon")
+    report_parser.add_argument("--from", dest="first_day", type=date.fromisoformat,
+                               default=today.replace(day=1))
+    report_parser.add_argument("--to", dest="last_day", type=date.fromisoformat, default=today)
+
+    args = parser.parse_args()
+    load_dotenv()
+    shard_map = ShardMap(os.getenv("SHARD_MAP", "shards.json"))
+
+    if args.command == "migrate":
+        for shard, result in sorted(scatter(shard_map, migrate_shard).items()):
+            if isinstance(result, Exception):
+                print(f"{shard}: failed: {result}")
+            else:
+                print(f"{shard}: " + (", ".join(result) if result else "already up to date"))
+    else:
+        report(shard_map, args.first_day, args.last_day)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Shared fixtures.
+
+Database tests run against real MySQL servers the test user can create
+databases on, listed in TEST_DB_HOSTS (host[:port], comma separated; the
+replica tests use the second one). TEST_DB_USER and TEST_DB_PASSWORD default
+to root with no password. Without a reachable server those tests are skipped.
+"""
+import os
+import sys
+import uuid
+
+import mysql.connector
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from salon_app import EventLog, ReplicaRouter, SalonApp, StatementRegistry  # noqa: E402
+
+
+def server_hosts():
+    return [host.strip() for host in os.getenv("TEST_DB_HOSTS", "").split(",") if host.strip()]
+
+
+def connect(host, database=None):
+    host, _, port = host.partition(":")
+    return mysql.connector.connect(
+        host=host,
+        port=int(port or 3306),
+        user=os.getenv("TEST_DB_USER", "root"),
+        password=os.getenv("TEST_DB_PASSWORD", ""),
+        database=database
+    )
+
+
+def schema_statements():
+    """schema.sql without its CREATE DATABASE/USE lines, one statement per item"""
+    with open(os.path.join(ROOT, "schema.sql"), encoding="utf-8") as f:
+        text = "".join(line for line in f if not line.lstrip().startswith("--"))
+    statements = (statement.strip() for statement in text.split(";"))
+    return [statement for statement in statements
+            if statement and not statement.upper().startswith(("CREATE DATABASE", "USE "))]
+
+
+@pytest.fixture
+def make_database():
+    """Factory for fresh schema.sql databases on the n-th test server, dropped afterwards.
+
+    Returns a (host, database) pair for connect().
+    """
+    hosts = server_hosts()
+    created = []
+
+    def make(server=0):
+        if server >= len(hosts):
+            pytest.skip(f"needs {server + 1} MySQL server(s) in TEST_DB_HOSTS")
+        try:
+            db = connect(hosts[server])
+        except mysql.connector.Error as err:
+            pytest.skip(f"MySQL server {hosts[server]} unreachable: {err}")
+
+        name = f"salon_test_{uuid.uuid4().hex[:12]}"
+        cursor = db.cursor()
+        cursor.execute(f"CREATE DATABASE {name}")
+        created.append((hosts[server], name))
+        cursor.execute(f"USE {name}")
+        for statement in schema_statements():
+            cursor.execute(statement)
+        db.commit()
+        db.close()
+        return hosts[server], name
+
+    yield make
+
+    for host, name in created:
+        db = connect(host)
+        db.cursor().execute(f"DROP DATABASE IF EXISTS {name}")
+        db.close()
+
+
+def headless_app(db, salon_id=1):
+    """SalonApp on an open connection without a Tk window, for its transaction code"""
+    app = SalonApp.__new__(SalonApp)
+    app.db = db
+    app.cursor = db.cursor()
+    app.statements = StatementRegistry(db)
+    app.router = ReplicaRouter(app.statements, [])
+    app.salon_id = salon_id
+    app.events = EventLog(salon_id)
+    app.reminders = None
+    return app
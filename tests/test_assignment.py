@@ -0,0 +1,107 @@
+"""OccupancyIndex ranking for "Book Any Provider" """
+from datetime import date, time, timedelta
+
+import salon_app
+from conftest import connect, headless_app
+from salon_app import LocalReplica, OccupancyIndex
+
+DAY = date(2026, 10, 20)
+CANDIDATES = [(11, 1, 60), (12, 2, 60)]     # (service_id, provider_id, duration)
+
+
+def ranked_providers(occupancy, start):
+    return [provider_id for _, _, provider_id, _ in occupancy.rank(CANDIDATES, DAY, start, {})]
+
+
+def test_busy_providers_are_skipped_and_emptier_days_win():
+    occupancy = OccupancyIndex()
+    occupancy.load_day(DAY, [(1, 600, 660), (2, 540, 570), (1, 780, 840)])
+
+    assert ranked_providers(occupancy, time(10, 0)) == [2]
+    assert ranked_providers(occupancy, time(15, 0)) == [2, 1]
+
+
+def test_reloading_the_day_reflects_changes_from_other_terminals():
+    occupancy = OccupancyIndex()
+    occupancy.load_day(DAY, [(1, 600, 660)])
+    assert ranked_providers(occupancy, time(10, 0)) == [2]
+
+    # Provider 1's appointment was cancelled and provider 2 was booked elsewhere
+    occupancy.load_day(DAY, [(2, 600, 660)])
+
+    assert ranked_providers(occupancy, time(10, 0)) == [1]
+    assert occupancy.booked[(1, DAY)] == 0
+
+
+class NoSelection:
+    def selection(self):
+        return ()
+
+
+class Var:
+    def __init__(self, value=""):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+
+def test_booking_sees_appointments_committed_after_the_dashboard_loaded(make_database, tmp_path, monkeypatch):
+    host, name = make_database()
+    db, other_terminal = connect(host, name), connect(host, name)
+    day = date.today() + timedelta(days=1)
+    cursor = other_terminal.cursor()
+    cursor.executemany(
+        "INSERT INTO users (salon_id, username, password, user_type, name) VALUES (1, %s, 'x', %s, %s)",
+        [("customer", "customer", "Customer"), ("first", "provider", "First"), ("second", "provider", "Second")]
+    )
+    cursor.execute("SELECT id FROM users ORDER BY id")
+    customer_id, first, second = [row[0] for row in cursor.fetchall()]
+    services = {}
+    for provider_id in (first, second):
+        cursor.execute(
+            "INSERT INTO services (salon_id, service_name, price, duration, provider_id) "
+            "VALUES (1, 'Hair Cut', 500, 60, %s)",
+            (provider_id,)
+        )
+        services[provider_id] = cursor.lastrowid
+    # The second provider's day is busier, so the first ranks ahead
+    cursor.execute(
+        "INSERT INTO appointments (salon_id, customer_id, service_id, provider_id, appointment_date, "
+        "start_time, end_time, status) VALUES (1, %s, %s, %s, %s, '15:00', '16:00', 'confirmed')",
+        (customer_id, services[second], second, day)
+    )
+    other_terminal.commit()
+
+    app = headless_app(db)
+    app.current_user = {"id": customer_id}
+    app.offline = False
+    app.local = LocalReplica(str(tmp_path / "cache.db"))
+    app.occupancy = OccupancyIndex()
+    app.services_tree, app.service_var, app.location_var = NoSelection(), Var("Hair Cut"), Var()
+    app.catalog = {
+        service_id: (service_id, "Hair Cut", name, 500, 60, "", "", provider_id)
+        for provider_id, service_id, name in ((first, services[first], "First"),
+                                              (second, services[second], "Second"))
+    }
+    app.parse_booking_slot = lambda: (day, time(10, 30))
+    app.refresh_all_views = lambda: None
+    monkeypatch.setattr(salon_app.messagebox, "showinfo", lambda *args: None)
+    monkeypatch.setattr(salon_app.messagebox, "showerror", lambda *args: None)
+    app.statements.fetchall("day_occupancy", (1, day))     # Dashboard reads open a snapshot
+
+    # Booked on another terminal after that read, overlapping without sharing the start time
+    cursor.execute(
+        "INSERT INTO appointments (salon_id, customer_id, service_id, provider_id, appointment_date, "
+        "start_time, end_time, status) VALUES (1, %s, %s, %s, %s, '10:00', '11:00', 'confirmed')",
+        (customer_id, services[first], first, day)
+    )
+    other_terminal.commit()
+
+    app.book_any_provider()
+
+    cursor.execute("SELECT provider_id FROM appointments WHERE start_time = '10:30:00'")
+    assert cursor.fetchall() == [(second,)]
+    app.local.close()
+    db.close()
+    other_terminal.close()
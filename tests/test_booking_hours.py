@@ -0,0 +1,57 @@
+"""Bookings must fit in the bookable hours the provider calendar shows, and calendar moves must not overlap"""
+from datetime import date, datetime, timedelta
+
+import pytest
+
+import salon_app
+from conftest import connect, headless_app
+from salon_app import within_bookable_hours
+
+
+@pytest.mark.parametrize("start, end, allowed", [
+    ("2026-10-20 08:00", "2026-10-20 09:00", True),
+    ("2026-10-20 20:00", "2026-10-20 21:00", True),
+    ("2026-10-20 07:45", "2026-10-20 08:45", False),
+    ("2026-10-20 20:30", "2026-10-20 21:30", False),
+    ("2026-10-20 23:30", "2026-10-21 00:30", False),
+])
+def test_within_bookable_hours(start, end, allowed):
+    assert within_bookable_hours(datetime.fromisoformat(start), datetime.fromisoformat(end)) is allowed
+
+
+def test_reschedule_sees_bookings_made_after_the_calendar_loaded(make_database, monkeypatch):
+    host, name = make_database()
+    db, customer_terminal = connect(host, name), connect(host, name)
+    day = date.today() + timedelta(days=1)
+    cursor = customer_terminal.cursor()
+    cursor.executemany(
+        "INSERT INTO users (salon_id, username, password, user_type, name) VALUES (1, %s, 'x', %s, %s)",
+        [("customer", "customer", "Customer"), ("provider", "provider", "Provider")]
+    )
+    cursor.execute("SELECT id FROM users ORDER BY id")
+    customer_id, provider_id = [row[0] for row in cursor.fetchall()]
+    cursor.execute(
+        "INSERT INTO services (salon_id, service_name, price, duration, provider_id) "
+        "VALUES (1, 'Facial', 800, 60, %s)",
+        (provider_id,)
+    )
+    service_id = cursor.lastrowid
+    insert = ("INSERT INTO appointments (salon_id, customer_id, service_id, provider_id, appointment_date, "
+              "start_time, end_time, status) VALUES (1, %s, %s, %s, %s, %s, %s, 'confirmed')")
+    cursor.execute(insert, (customer_id, service_id, provider_id, day, "09:00", "10:00"))
+    appointment_id = cursor.lastrowid
+    customer_terminal.commit()
+
+    app = headless_app(db)
+    app.current_user = {"id": provider_id}
+    monkeypatch.setattr(salon_app.messagebox, "showerror", lambda *args: None)
+    app.statements.fetchall("provider_store", (provider_id, day))     # The calendar's load
+
+    cursor.execute(insert, (customer_id, service_id, provider_id, day, "14:30", "15:30"))
+    customer_terminal.commit()
+
+    assert app.reschedule_appointment(appointment_id, day, 14 * 60, 15 * 60) is False
+    cursor.execute("SELECT start_time FROM appointments WHERE id = %s", (appointment_id,))
+    assert cursor.fetchone() == (timedelta(hours=9),)
+    db.close()
+    customer_terminal.close()
@@ -0,0 +1,51 @@
+"""Event buffering around failed statements and booking rollbacks"""
+from datetime import date, time, timedelta
+
+import mysql.connector
+
+import salon_app
+from conftest import connect, headless_app
+from salon_app import EventLog
+
+
+class FailingCursor:
+    def execute(self, query, params=()):
+        raise mysql.connector.Error("Lock wait timeout exceeded")
+
+
+class RecordingCursor:
+    def __init__(self):
+        self.params = []
+
+    def execute(self, query, params=()):
+        self.params.append(params)
+
+
+def test_failed_flush_keeps_events_until_discarded():
+    events = EventLog(1)
+    events.record("appointment", 7, 3, "booked", after={"id": 7})
+
+    try:
+        events.flush(FailingCursor())
+    except mysql.connector.Error:
+        pass
+    assert len(events.pending) == 1
+
+    cursor = RecordingCursor()
+    events.flush(cursor)
+    assert events.pending == []
+    assert cursor.params[0][:5] == [1, "appointment", 7, 3, "booked"]
+
+
+def test_failed_waitlist_join_rolls_back(make_database, monkeypatch):
+    db = connect(*make_database())
+    monkeypatch.setattr(salon_app.messagebox, "showerror", lambda *args: None)
+    app = headless_app(db)
+    app.current_user = {"id": 999}      # No such customer: the INSERT hits the foreign key
+    app.events.record("appointment", 1, 1, "booked")
+
+    app.join_waitlist(1, 1, date.today() + timedelta(days=1), time(10), time(10, 30))
+
+    assert app.events.pending == []
+    assert not db.in_transaction
+    db.close()
@@ -0,0 +1,94 @@
+"""Offline booking queue: local bookkeeping and replay against the server"""
+import sqlite3
+from datetime import date, timedelta
+
+from conftest import connect, headless_app
+from salon_app import LocalReplica
+
+DAY = date.today() + timedelta(days=2)
+
+
+def test_outcomes_are_shown_to_their_customer_once(tmp_path):
+    local = LocalReplica(str(tmp_path / "cache.db"))
+    booked = local.enqueue_booking(1, 10, 5, DAY, "10:00:00", "10:30:00")
+    taken = local.enqueue_booking(1, 10, 5, DAY, "11:00:00", "11:30:00")
+    rejected = local.enqueue_booking(2, 10, 5, DAY, "12:00:00", "12:30:00")
+
+    local.finish_bookings([(booked, "booked", None), (taken, "conflict", None),
+                           (rejected, "failed", "Cannot add or update a child row")])
+
+    assert local.queued_bookings(10) == []
+    assert local.customer_appointments(1) == []     # Placeholders are gone
+    assert [row[0] for row in local.unnotified_outcomes(1)] == [taken]
+    assert local.unnotified_outcomes(2)[0][4:] == ("failed", "Cannot add or update a child row")
+
+    local.mark_notified([taken])
+    assert local.unnotified_outcomes(1) == []
+    local.close()
+
+
+def test_older_cache_files_gain_outcome_columns(tmp_path):
+    path = str(tmp_path / "cache.db")
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE outbox (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            customer_id INTEGER, service_id INTEGER, provider_id INTEGER,
+            appointment_date TEXT, start_time TEXT, end_time TEXT,
+            state TEXT DEFAULT 'queued', created_at TEXT DEFAULT CURRENT_TIMESTAMP
+        );
+        INSERT INTO outbox (customer_id, service_id, provider_id, appointment_date, start_time, end_time, state)
+        VALUES (1, 10, 5, '2026-01-01', '10:00:00', '10:30:00', 'conflict'),
+               (1, 10, 5, '2026-01-02', '10:00:00', '10:30:00', 'queued');
+    """)
+    conn.commit()
+    conn.close()
+
+    local = LocalReplica(path)
+
+    assert len(local.queued_bookings(10)) == 1
+    assert local.unnotified_outcomes(1) == []       # Already reported by the old popup
+    local.close()
+
+
+def test_replay_isolates_rejected_bookings(make_database, tmp_path):
+    db = connect(*make_database())
+    cursor = db.cursor()
+    cursor.executemany(
+        "INSERT INTO users (salon_id, username, password, user_type, name) VALUES (1, %s, 'x', %s, %s)",
+        [("online", "customer", "Online"), ("offline", "customer", "Offline"), ("provider", "provider", "P")]
+    )
+    cursor.execute("SELECT id FROM users ORDER BY id")
+    online, offline, provider = [row[0] for row in cursor.fetchall()]
+    cursor.execute(
+        "INSERT INTO services (salon_id, service_name, price, duration, provider_id) "
+        "VALUES (1, 'Manicure', 400, 30, %s)",
+        (provider,)
+    )
+    service = cursor.lastrowid
+    # Booked online while the terminal was offline
+    cursor.execute(
+        "INSERT INTO appointments (salon_id, customer_id, service_id, provider_id, appointment_date, "
+        "start_time, end_time) VALUES (1, %s, %s, %s, %s, '11:00:00', '11:30:00')",
+        (online, service, provider, DAY)
+    )
+    db.commit()
+
+    app = headless_app(db)
+    app.local = LocalReplica(str(tmp_path / "cache.db"))
+    first = app.local.enqueue_booking(offline, service, provider, DAY, "10:00:00", "10:30:00")
+    taken = app.local.enqueue_booking(offline, service, provider, DAY, "11:00:00", "11:30:00")
+    missing = app.local.enqueue_booking(offline, service + 1, provider, DAY, "12:00:00", "12:30:00")
+    last = app.local.enqueue_booking(offline, service, provider, DAY, "13:00:00", "13:30:00")
+
+    app.sync_outbox()
+
+    states = dict(app.local.conn.execute("SELECT id, state FROM outbox"))
+    assert states == {first: "booked", taken: "conflict", missing: "failed", last: "booked"}
+    cursor.execute("SELECT start_time FROM appointments WHERE customer_id = %s ORDER BY start_time", (offline,))
+    assert [str(row[0]) for row in cursor.fetchall()] == ["10:00:00", "13:00:00"]
+    cursor.execute("SELECT requested_start FROM waitlist WHERE customer_id = %s", (offline,))
+    assert [str(row[0]) for row in cursor.fetchall()] == ["11:00:00"]
+    assert [row[0] for row in app.local.unnotified_outcomes(offline)] == [taken, missing]
+    app.local.close()
+    db.close()
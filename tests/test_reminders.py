@@ -0,0 +1,87 @@
+"""ReminderScheduler: horizon loading and changes replayed from other terminals"""
+import json
+from datetime import datetime, timedelta
+
+from conftest import connect, headless_app
+from salon_app import ReminderScheduler
+
+
+def pending(scheduler):
+    """Current (appointment_id, offset) reminders, ignoring lazily dropped entries"""
+    return sorted((appointment_id, offset) for _, appointment_id, version, offset in scheduler.heap
+                  if version == scheduler.versions.get(appointment_id, 0))
+
+
+def loaded(tmp_path, rows):
+    scheduler = ReminderScheduler([1440, 60], str(tmp_path / "outbox.jsonl"))
+    horizon_end = datetime.now() + scheduler.horizon
+    scheduler.advance(rows, horizon_end)
+    return scheduler
+
+
+def in_hours(hours):
+    start = datetime.now() + timedelta(hours=hours)
+    return start.date(), timedelta(hours=start.hour, minutes=start.minute)
+
+
+def test_only_reminders_inside_the_horizon_are_held(tmp_path):
+    scheduler = loaded(tmp_path, [(1, *in_hours(30)), (2, *in_hours(24 * 10))])
+    assert pending(scheduler) == [(1, 60), (1, 1440)]
+
+
+def test_changes_from_other_terminals_replace_reminders(tmp_path):
+    scheduler = loaded(tmp_path, [(1, *in_hours(30)), (2, *in_hours(30)), (3, *in_hours(30))])
+
+    scheduler.apply([
+        (1, None, None, "cancelled"),
+        (2, *in_hours(24 * 10), "confirmed"),      # Rescheduled beyond the horizon
+        (3, None, None, None),                      # Deleted with its service
+        (4, *in_hours(5), "pending"),               # Booked elsewhere, day reminder already past
+    ])
+
+    assert pending(scheduler) == [(4, 60)]
+
+
+def test_reschedule_inside_the_horizon_keeps_one_set_of_reminders(tmp_path):
+    scheduler = loaded(tmp_path, [(1, *in_hours(40))])
+    day, start = in_hours(30)
+
+    scheduler.apply([(1, day, start, "confirmed")])
+    scheduler.apply([(1, day, start, "confirmed")])     # Seen again through the overlap
+
+    assert pending(scheduler) == [(1, 60), (1, 1440)]
+    fire_at = {offset: at for at, appointment_id, version, offset in scheduler.heap
+               if version == scheduler.versions.get(appointment_id, 0)}
+    assert fire_at[60] == int(ReminderScheduler.start_datetime(day, start).timestamp()) - 3600
+
+
+class IdleRoot:
+    """Tk stand-in that drops the refresh's re-arming"""
+
+    def after(self, ms, callback):
+        pass
+
+
+def test_refresh_sees_bookings_committed_after_the_first_poll(make_database, tmp_path):
+    host, name = make_database()
+    db, other_terminal = connect(host, name), connect(host, name)
+    app = headless_app(db)
+    app.root, app.offline = IdleRoot(), False
+    app.reminders = ReminderScheduler([60], str(tmp_path / "outbox.jsonl"))
+    app.reminder_event_id, app.reminder_events_seen = None, set()
+    app.refresh_reminders()
+
+    day, start = in_hours(5)
+    cursor = other_terminal.cursor()
+    cursor.execute(
+        "INSERT INTO appointment_events (salon_id, entity, entity_id, provider_id, action, after_image) "
+        "VALUES (1, 'appointment', 42, 7, 'booked', %s)",
+        (json.dumps({"appointment_date": day.isoformat(), "start_time": str(start).zfill(8),
+                     "status": "pending"}),)
+    )
+    other_terminal.commit()
+    app.refresh_reminders()
+
+    assert pending(app.reminders) == [(42, 60)]
+    db.close()
+    other_terminal.close()
@@ -0,0 +1,148 @@
+"""ReplicaRouter: replica routing, read-your-writes stickiness and lag fallback"""
+import time
+
+import mysql.connector
+import pytest
+
+from conftest import connect
+from salon_app import ReplicaRouter, StatementRegistry
+
+
+class FakeReplica:
+    """Connection stand-in that only answers SHOW REPLICA STATUS"""
+
+    def __init__(self, lag=0):
+        self.lag = lag              # Seconds behind, None when replication is stopped
+        self.fail = False
+        self.checks = 0
+        self.autocommit = False
+
+    def cursor(self, **kwargs):
+        return FakeStatusCursor(self)
+
+
+class FakeStatusCursor:
+    def __init__(self, replica):
+        self.replica = replica
+
+    def execute(self, query, params=()):
+        assert query == "SHOW REPLICA STATUS"
+        self.replica.checks += 1
+        if self.replica.fail:
+            raise mysql.connector.Error("Lost connection to MySQL server")
+
+    def fetchone(self):
+        return {"Seconds_Behind_Source": self.replica.lag}
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable time.monotonic; advance with clock.now += seconds"""
+    class Clock:
+        now = 1000.0
+
+    monkeypatch.setattr(time, "monotonic", lambda: Clock.now)
+    return Clock
+
+
+def router_with(*replicas):
+    return ReplicaRouter(StatementRegistry(object()), list(replicas))
+
+
+def test_reads_rotate_across_caught_up_replicas(clock):
+    first, second = FakeReplica(), FakeReplica()
+    router = router_with(first, second)
+
+    used = [router.reader().db for _ in range(4)]
+
+    assert used == [first, second, first, second]
+
+
+def test_replica_connections_use_autocommit():
+    replica = FakeReplica()
+    router_with(replica)
+    assert replica.autocommit is True
+
+
+def test_reads_stay_on_primary_after_a_write(clock):
+    replica = FakeReplica()
+    router = router_with(replica)
+
+    router.mark_write()
+    assert router.reader() is router.primary
+    clock.now += ReplicaRouter.STICKY_SECONDS - 0.1
+    assert router.reader() is router.primary
+    clock.now += 0.2
+    assert router.reader().db is replica
+
+
+def test_lagging_replica_is_skipped(clock):
+    lagging, current = FakeReplica(lag=ReplicaRouter.MAX_LAG_SECONDS + 1), FakeReplica()
+    router = router_with(lagging, current)
+
+    assert {router.reader().db for _ in range(4)} == {current}
+
+
+@pytest.mark.parametrize("lag, fail", [(ReplicaRouter.MAX_LAG_SECONDS + 1, False), (None, False), (0, True)])
+def test_falls_back_to_primary_without_a_usable_replica(clock, lag, fail):
+    replica = FakeReplica(lag=lag)
+    replica.fail = fail
+    router = router_with(replica)
+
+    assert router.reader() is router.primary
+
+
+def test_lag_is_rechecked_once_per_interval(clock):
+    replica = FakeReplica(lag=ReplicaRouter.MAX_LAG_SECONDS + 1)
+    router = router_with(replica)
+
+    assert router.reader() is router.primary
+    replica.lag = 0
+    assert router.reader() is router.primary    # Cached verdict
+    assert replica.checks == 1
+
+    clock.now += ReplicaRouter.LAG_CHECK_INTERVAL
+    assert router.reader().db is replica
+    assert replica.checks == 2
+
+
+def test_replica_reads_see_rows_committed_after_the_first_read(make_database):
+    # Two servers without replication between them: rows written straight to
+    # the "replica" show which connection a read used
+    primary_host, primary_name = make_database(0)
+    replica_host, replica_name = make_database(1)
+    primary = connect(primary_host, primary_name)
+    replica = connect(replica_host, replica_name)
+    writer = connect(replica_host, replica_name)
+
+    router = ReplicaRouter(StatementRegistry(primary), [replica])
+    router.replicas[0].update(usable=True, checked_at=time.monotonic())
+
+    def service_types():
+        return sorted(row[0] for row in router.reader().fetchall("service_types", (1,)))
+
+    cursor = writer.cursor()
+    cursor.execute(
+        "INSERT INTO users (salon_id, username, password, user_type, name) "
+        "VALUES (1, 'provider', 'x', 'provider', 'Provider')"
+    )
+    provider_id = cursor.lastrowid
+    writer.commit()
+    assert service_types() == []
+
+    cursor.execute(
+        "INSERT INTO services (salon_id, service_name, price, duration, provider_id) "
+        "VALUES (1, 'Pedicure', 600, 45, %s)",
+        (provider_id,)
+    )
+    writer.commit()
+    assert service_types() == ["Pedicure"]
+
+    router.mark_write()
+    assert service_types() == []    # Primary, which has no services
+
+    for db in (primary, replica, writer):
+        db.close()
@@ -0,0 +1,62 @@
+"""ServiceSearchIndex: filters applied before the page is cut, and fuzzy ranking"""
+from salon_app import GEOCODES, ProviderLocator, SalonApp, ServiceSearchIndex
+
+PAGE = ServiceSearchIndex.PAGE_SIZE
+
+
+def row(service_id, name, location):
+    return (service_id, name, f"stylist{service_id}", 500, 30, location, "", service_id)
+
+
+def catalog():
+    """More exact "haircut" hits in Andheri than fit a page, a few services elsewhere"""
+    rows = [row(i, "Kids Haircut", "Andheri") for i in range(1, PAGE * 2 + 1)]
+    rows += [row(1000, "Hair Cut & Style", "Bandra"), row(1001, "Hair Colour", "Bandra"),
+             row(1002, "Facial", "Bandra")]
+    index = ServiceSearchIndex()
+    index.build(rows)
+    return index
+
+
+def test_filters_apply_before_the_page_is_cut():
+    results = catalog().search("hair", filters={5: "Bandra"})
+    assert sorted(service[0] for service in results) == [1000, 1001]
+
+
+def test_fuzzy_matches_rank_even_when_exact_hits_fill_the_page():
+    index = catalog()
+    assert 1000 in [service[0] for service in index.search("haircut")]
+    assert [service[0] for service in index.search("haircut", filters={1: "Hair Cut & Style"})] == [1000]
+
+
+def test_unlimited_search_returns_every_match():
+    found = {service[0] for service in catalog().search("haircut", limit=None)}
+    assert found >= set(range(1, PAGE * 2 + 1)) | {1000}
+
+
+class Var:
+    def __init__(self, value=""):
+        self.value = value
+
+    def get(self):
+        return self.value
+
+
+def test_near_me_considers_matches_beyond_the_first_page():
+    # A full page of equally relevant services from far-away providers, then one nearby
+    rows = [row(i, "Hair Cut", "Delhi") for i in range(1, PAGE + 51)] + [row(500, "Hair Cut", "Bandra")]
+    app = SalonApp.__new__(SalonApp)
+    app.catalog = {service[0]: service for service in rows}
+    app.search_index = ServiceSearchIndex()
+    app.search_index.build(rows)
+    app.provider_locator = ProviderLocator()
+    app.provider_locator.build([(service[7], 28.61, 77.21) for service in rows[:-1]]
+                               + [(500, *GEOCODES["Bandra"])])
+    app.search_var, app.near_var = Var("hair cut"), Var("Bandra")
+    app.location_var, app.service_var, app.radius_var = Var(), Var(), Var()
+    shown = []
+    app.update_services_tree = shown.extend
+
+    app.search_services()
+
+    assert 500 in [service[0] for service in shown]
@@ -0,0 +1,56 @@
+"""Provider status changes against the transition rules"""
+from datetime import date, timedelta
+
+from conftest import connect, headless_app
+
+
+def book(db, statuses):
+    """One appointment per status for a fresh provider; returns their ids in order"""
+    cursor = db.cursor()
+    cursor.executemany(
+        "INSERT INTO users (salon_id, username, password, user_type, name) VALUES (1, %s, 'x', %s, %s)",
+        [("customer", "customer", "Customer"), ("provider", "provider", "Provider")]
+    )
+    cursor.execute("SELECT id FROM users ORDER BY id")
+    customer_id, provider_id = [row[0] for row in cursor.fetchall()]
+    cursor.execute(
+        "INSERT INTO services (salon_id, service_name, price, duration, provider_id) "
+        "VALUES (1, 'Facial', 800, 60, %s)",
+        (provider_id,)
+    )
+    service_id = cursor.lastrowid
+
+    ids = []
+    day = date.today() + timedelta(days=1)
+    for hour, status in enumerate(statuses, start=9):
+        cursor.execute(
+            "INSERT INTO appointments (salon_id, customer_id, service_id, provider_id, appointment_date, "
+            "start_time, end_time, status) VALUES (1, %s, %s, %s, %s, %s, %s, %s)",
+            (customer_id, service_id, provider_id, day, f"{hour}:00", f"{hour + 1}:00", status)
+        )
+        ids.append(cursor.lastrowid)
+    db.commit()
+    return ids
+
+
+def test_complete_applies_to_pending_and_confirmed_only(make_database):
+    db = connect(*make_database())
+    pending, confirmed, completed, cancelled = book(db, ("pending", "confirmed", "completed", "cancelled"))
+
+    updated, _ = headless_app(db).apply_status_change([pending, confirmed, completed, cancelled], "completed")
+
+    assert updated == [pending, confirmed]
+    cursor = db.cursor()
+    cursor.execute("SELECT status, COUNT(*) FROM appointments GROUP BY status")
+    assert dict(cursor.fetchall()) == {"completed": 3, "cancelled": 1}
+    db.close()
+
+
+def test_finished_appointments_cannot_reopen(make_database):
+    db = connect(*make_database())
+    ids = book(db, ("completed", "cancelled"))
+
+    updated, backfilled = headless_app(db).apply_status_change(ids, "confirmed")
+
+    assert updated == [] and backfilled == []
+    db.close()
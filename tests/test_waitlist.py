@@ -0,0 +1,203 @@
+"""Waitlist backfill under bursts of cancellations, and the upgrade of older databases"""
+import threading
+import time
+from datetime import date, timedelta
+
+import mysql.connector
+
+from conftest import connect, headless_app
+from tenancy import migrate_shard
+
+# Floors well below a local server's rate; they catch per-cancellation
+# regressions such as lock waits or full scans, not tuning changes
+MIN_CANCELLATIONS_PER_SECOND = 25
+SLOTS_PER_DAY = 16
+FIRST_DAY = date.today() + timedelta(days=1)
+
+
+def slot(i):
+    """Date and 30-minute (start, end) of the i-th seeded appointment"""
+    start = timedelta(hours=9, minutes=30 * (i % SLOTS_PER_DAY))
+    return FIRST_DAY + timedelta(days=i // SLOTS_PER_DAY), start, start + timedelta(minutes=30)
+
+
+def seed(db, providers, per_provider):
+    """Providers with booked slots and one waiting customer per slot; returns appointment ids per provider"""
+    cursor = db.cursor()
+    cursor.executemany(
+        "INSERT INTO users (salon_id, username, password, user_type, name) VALUES (1, %s, 'x', %s, %s)",
+        [("booked", "customer", "Booked"), ("waiting", "customer", "Waiting")]
+        + [(f"provider{p}", "provider", f"Provider {p}") for p in range(providers)]
+    )
+    cursor.execute("SELECT id, username FROM users")
+    users = {username: user_id for user_id, username in cursor.fetchall()}
+
+    appointments = {}
+    for p in range(providers):
+        provider_id = users[f"provider{p}"]
+        cursor.execute(
+            "INSERT INTO services (salon_id, service_name, price, duration, provider_id) "
+            "VALUES (1, 'Hair Cut', 500, 30, %s)",
+            (provider_id,)
+        )
+        service_id = cursor.lastrowid
+        slots = [slot(i) for i in range(per_provider)]
+        cursor.executemany(
+            "INSERT INTO appointments (salon_id, customer_id, service_id, provider_id, appointment_date, "
+            "start_time, end_time, status) VALUES (1, %s, %s, %s, %s, %s, %s, 'confirmed')",
+            [(users["booked"], service_id, provider_id, day, start, end) for day, start, end in slots]
+        )
+        cursor.executemany(
+            "INSERT INTO waitlist (salon_id, customer_id, service_id, provider_id, requested_date, "
+            "requested_start, requested_end) VALUES (1, %s, %s, %s, %s, %s, %s)",
+            [(users["waiting"], service_id, provider_id, day, start, end) for day, start, end in slots]
+        )
+        cursor.execute("SELECT id FROM appointments WHERE provider_id = %s ORDER BY id", (provider_id,))
+        appointments[provider_id] = [row[0] for row in cursor.fetchall()]
+    db.commit()
+    return appointments
+
+
+def cancel_one_by_one(app, appointment_ids):
+    """Cancel like a provider clicking through a list: one transaction each; returns bookings"""
+    backfilled = []
+    for appointment_id in appointment_ids:
+        while True:
+            try:
+                backfilled += app.apply_status_change([appointment_id], "cancelled")[1]
+                break
+            except mysql.connector.Error as err:
+                if err.errno != 1213:  # Deadlock victims are retried, as MySQL advises
+                    raise
+    return backfilled
+
+
+def assert_every_slot_backfilled(db, cancelled):
+    cursor = db.cursor()
+    cursor.execute("SELECT COUNT(*) FROM waitlist WHERE status = 'waiting'")
+    assert cursor.fetchone()[0] == 0
+    cursor.execute(
+        "SELECT COUNT(*), COUNT(DISTINCT provider_id, appointment_date, start_time) FROM appointments "
+        "WHERE status = 'pending'"
+    )
+    assert cursor.fetchone() == (cancelled, cancelled)
+    cursor.execute("SELECT COUNT(*) FROM appointment_events WHERE action = 'booked'")
+    assert cursor.fetchone()[0] == cancelled
+
+
+def test_cancellation_burst_backfills_every_slot(make_database):
+    host, name = make_database()
+    db = connect(host, name)
+    appointments = seed(db, providers=1, per_provider=400)
+    app = headless_app(db)
+
+    start = time.perf_counter()
+    backfilled = cancel_one_by_one(app, next(iter(appointments.values())))
+    elapsed = time.perf_counter() - start
+
+    assert len(backfilled) == 400
+    assert_every_slot_backfilled(db, 400)
+    rate = 400 / elapsed
+    print(f"\n{rate:.0f} cancellations/s with backfill (one terminal)")
+    assert rate >= MIN_CANCELLATIONS_PER_SECOND
+    db.close()
+
+
+def test_concurrent_cancellation_bursts(make_database):
+    host, name = make_database()
+    db = connect(host, name)
+    appointments = seed(db, providers=4, per_provider=150)
+    db.close()
+
+    results, errors = {}, []
+
+    def terminal(provider_id, appointment_ids):
+        terminal_db = connect(host, name)
+        try:
+            results[provider_id] = cancel_one_by_one(headless_app(terminal_db), appointment_ids)
+        except mysql.connector.Error as err:
+            errors.append(err)
+        finally:
+            terminal_db.close()
+
+    threads = [threading.Thread(target=terminal, args=item) for item in appointments.items()]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    assert not errors
+    assert sum(len(bookings) for bookings in results.values()) == 600
+    db = connect(host, name)
+    assert_every_slot_backfilled(db, 600)
+    db.close()
+    rate = 600 / elapsed
+    print(f"\n{rate:.0f} cancellations/s with backfill (4 terminals)")
+    assert rate >= MIN_CANCELLATIONS_PER_SECOND
+
+
+def test_batch_cancel_backfills_in_one_transaction(make_database):
+    host, name = make_database()
+    db = connect(host, name)
+    appointment_ids = next(iter(seed(db, providers=1, per_provider=50).values()))
+
+    updated, backfilled = headless_app(db).apply_status_change(appointment_ids, "cancelled")
+
+    assert updated == appointment_ids
+    assert len(backfilled) == 50
+    assert_every_slot_backfilled(db, 50)
+    db.close()
+
+
+def test_cancel_without_waitlist_table(make_database):
+    host, name = make_database()
+    db = connect(host, name)
+    appointment_ids = next(iter(seed(db, providers=1, per_provider=3).values()))
+    db.cursor().execute("DROP TABLE waitlist")
+
+    updated, backfilled = headless_app(db).apply_status_change(appointment_ids, "cancelled")
+
+    assert updated == appointment_ids
+    assert backfilled == []
+    db.close()
+
+
+def test_migrate_adds_missing_tables_and_releases_cancelled_start_times(make_database):
+    host, name = make_database()
+    db = connect(host, name)
+    appointment_ids = next(iter(seed(db, providers=1, per_provider=1).values()))
+    # Shape of a database created from the first schema.sql
+    cursor = db.cursor()
+    cursor.execute("DROP TABLE waitlist")
+    cursor.execute("DROP TABLE appointments_archive")
+    cursor.execute("DROP TABLE appointment_events")
+    cursor.execute("DROP TABLE schedule_snapshots")
+    cursor.execute("""
+        ALTER TABLE appointments
+        DROP INDEX unique_booking,
+        DROP COLUMN active_start_time,
+        ADD UNIQUE KEY unique_booking (provider_id, appointment_date, start_time)
+    """)
+
+    changes = migrate_shard(db)
+
+    assert "waitlist" in changes
+    assert "appointments_archive" in changes
+    assert "appointment_events" in changes and "schedule_snapshots" in changes
+    assert "appointments.active_start_time, unique_booking" in changes
+    assert migrate_shard(db) == []
+
+    app = headless_app(db)
+    app.apply_status_change(appointment_ids, "cancelled")
+    cursor.execute(
+        "INSERT INTO appointments (salon_id, customer_id, service_id, provider_id, appointment_date, "
+        "start_time, end_time) SELECT salon_id, customer_id, service_id, provider_id, appointment_date, "
+        "start_time, end_time FROM appointments WHERE id = %s",
+        (appointment_ids[0],)
+    )
+    db.commit()
+    cursor.execute("SELECT COUNT(*) FROM appointments")
+    assert cursor.fetchone()[0] == 2
+    db.close()